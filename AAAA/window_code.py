@@ -14,6 +14,7 @@ import time
 from pathlib import Path
 from typing import Dict, Any, Optional, Tuple
 import numpy as np
+import cv2
 
 from PySide6.QtCore import QObject, QThread, Signal, QTimer, Qt, QMutex, QWaitCondition
 from PySide6.QtGui import QPixmap, QImage, QPainter
@@ -131,7 +132,6 @@ class SimpleVideoPlayer(QObject):
     def seek_frame(self, target_frame: int):
         """跳转到指定帧并立即读取一帧用于更新显示（供进度条拖动使用）"""
         try:
-            import cv2
             if not self.cap or not self.cap.isOpened():
                 return
             # 设置目标帧号并读取一帧
@@ -169,9 +169,6 @@ class SimpleVideoPlayer(QObject):
     def _video_playback_simple(self, video_path: str):
         """简单的视频播放 - 专注于流畅显示"""
         try:
-            import cv2
-            import numpy as np
-
             self.cap = cv2.VideoCapture(video_path)
             if not self.cap.isOpened():
                 self.status_update.emit(f"无法打开视频文件: {video_path}")
@@ -302,9 +299,6 @@ class SimpleVideoPlayer(QObject):
     def _camera_playback_simple(self, camera_id: int):
         """简单的摄像头播放 - 专注于流畅显示"""
         try:
-            import cv2
-            import numpy as np
-
             self.cap = cv2.VideoCapture(camera_id)
             if not self.cap.isOpened():
                 self.status_update.emit(f"无法打开摄像头: {camera_id}")
@@ -448,9 +442,6 @@ class FrameGrabberWorker(QObject):
         self.status_update.emit("开始抓取帧进行检测...")
         
         try:
-            import cv2
-            import numpy as np
-            
             while self.processing:
                 # 从播放器获取当前帧
                 frame = self.video_player.get_current_frame()
@@ -572,6 +563,35 @@ class FrameGrabberWorker(QObject):
 class YOLOMainWindowLogic(QObject):
     """主窗口逻辑控制器 - 简化版本"""
     
+    # 后台图片推理完成/失败信号（工作线程发出，在主线程中更新界面）
+    image_processed = Signal(str, object, object)  # (图片路径, 原图, 结果字典)
+    image_failed = Signal(str, str)  # (图片路径, 错误信息)
+    
+    # 任务类型到模块类型的映射（类级常量，避免每次调用重建字典）
+    TASK_MODULE_MAP = {
+        'detection': 'analyzer',
+        'classification': 'classifier',
+        'keypoint': 'keypoint',
+        'tracker': 'Tracker',
+        'segmentation': 'analyzer'  # 分割也使用分析器
+    }
+    
+    # 模块类型到显示名称的映射
+    MODULE_DISPLAY_NAMES = {
+        'analyzer': '目标检测',
+        'classifier': '图像分类',
+        'keypoint': '关键点检测',
+        'Tracker': '目标跟踪'
+    }
+    
+    # 模块类型到模块文件的映射
+    MODULE_MAP = {
+        'analyzer': 'yolo_analyzer',
+        'classifier': 'yolo_classifier',
+        'keypoint': 'yolo_keypoint',
+        'Tracker': 'yolo_Tracker',
+    }
+    
     def __init__(self, ui_window: YOLOMainWindowUI):
         super().__init__()
         self.ui = ui_window
@@ -583,11 +603,13 @@ class YOLOMainWindowLogic(QObject):
         # 状态变量
         self.current_yolo_module = None
         self.model_loaded = False
+        self.loaded_module_key = None  # 已加载模块对应的 (模型路径, 模块类型)
         self.model_path = None
         self.selected_module_type = None
         
         # 处理状态
         self.is_processing = False      # 是否正在YOLO处理
+        self.image_worker_busy = False  # 后台线程是否正在处理图片
         self.is_playing = False         # 是否正在播放
         self.current_file = None
         self.current_mode = None        # 'image', 'video', 'camera'
@@ -638,6 +660,10 @@ class YOLOMainWindowLogic(QObject):
         self.frame_grabber.error_occurred.connect(self._on_grabber_error)
         self.frame_grabber.finished.connect(self._on_grabber_finished)
         
+        # ===== 后台图片推理信号 =====
+        self.image_processed.connect(self._on_image_processed)
+        self.image_failed.connect(self._on_image_failed)
+        
         # ===== 文件菜单信号 =====
         self.ui.file_menu_init.connect(self._on_file_init)
         self.ui.file_menu_exit.connect(self._on_file_exit)
@@ -757,7 +783,6 @@ class YOLOMainWindowLogic(QObject):
         """用户拖动进度条"""
         if self.current_mode == 'video' and hasattr(self.video_player, 'cap') and self.video_player.cap:
             try:
-                import cv2
                 # 跳转到指定位置
                 total_frames = self.video_player.total_frames
                 if total_frames > 0:
@@ -925,21 +950,12 @@ class YOLOMainWindowLogic(QObject):
                     # 获取任务类型
                     task_type = model_info.get('task_type', 'detection')
                     
-                    # 任务类型到模块类型的映射
-                    task_module_map = {
-                        'detection': 'analyzer',
-                        'classification': 'classifier',
-                        'keypoint': 'keypoint',
-                        'tracker': 'Tracker',
-                        'segmentation': 'analyzer'  # 分割也使用分析器
-                    }
-                    
-                    if task_type not in task_module_map:
+                    if task_type not in self.TASK_MODULE_MAP:
                         # 显示选择对话框
                         self._show_model_type_dialog(model_path)
                     else:
                         # 自动确定模块类型
-                        self.selected_module_type = task_module_map[task_type]
+                        self.selected_module_type = self.TASK_MODULE_MAP[task_type]
                         self.model_path = model_path
                         
                         # 获取显示信息
@@ -1039,14 +1055,7 @@ class YOLOMainWindowLogic(QObject):
             self.selected_module_type = module_type
             self.model_path = model_path
             
-            module_display_names = {
-                'analyzer': '目标检测',
-                'classifier': '图像分类',
-                'keypoint': '关键点检测',
-                'Tracker': '目标跟踪'
-            }
-            
-            display_name = module_display_names.get(module_type, module_type)
+            display_name = self.MODULE_DISPLAY_NAMES.get(module_type, module_type)
             
             # 更新UI显示模型信息（但不加载模型）
             self.right_panel.update_model_info(
@@ -1162,6 +1171,11 @@ class YOLOMainWindowLogic(QObject):
                 QMessageBox.warning(self.ui, "警告", "请先选择模型和模块类型！")
                 return
             
+            # 后台线程仍在用当前模块处理图片时不能开始新的处理（Ultralytics预测器非线程安全）
+            if self.image_worker_busy:
+                QMessageBox.information(self.ui, "提示", "图片仍在处理中，请稍候再开始")
+                return
+            
             # 加载模型（此时才真正加载）
             if not self._load_yolo_module():
                 return
@@ -1178,26 +1192,54 @@ class YOLOMainWindowLogic(QObject):
             self._show_error("开始处理失败", str(e))
     
     def _process_image(self):
-        """处理图片"""
+        """处理图片：解码和推理在后台线程执行，避免大图推理期间界面卡住"""
         try:
             if not self._load_yolo_module():
                 return
             
             print(f"开始处理图片: {self.current_file}")
+            self.image_worker_busy = True
+            threading.Thread(target=self._run_image_inference,
+                             args=(self.current_file, self.current_yolo_module),
+                             daemon=True).start()
             
+        except Exception as e:
+            self.image_worker_busy = False
+            self._show_error("图片处理失败", str(e))
+    
+    def _run_image_inference(self, image_path, yolo_module):
+        """后台线程：读取图片并调用YOLO模块处理，完成后通过信号交给主线程显示"""
+        try:
             # 加载图片
-            import cv2
-            import numpy as np
-            from PySide6.QtGui import QImage, QPixmap
-            
-            image = cv2.imread(self.current_file)
+            image = cv2.imread(image_path)
             if image is None:
-                QMessageBox.warning(self.ui, "警告", "无法读取图片文件")
+                self.image_failed.emit(image_path, "无法读取图片文件")
                 return
             
             # 调用YOLO模块处理图片（返回字典，不是元组）
-            result_dict = self.current_yolo_module.process_frame(image)
-            
+            result_dict = yolo_module.process_frame(image)
+            self.image_processed.emit(image_path, image, result_dict)
+        except Exception as e:
+            self.image_failed.emit(image_path, str(e))
+    
+    def _is_stale_image_result(self, image_path):
+        """处理期间已切换到视频/摄像头或其他图片时，后台线程的结果已过期"""
+        return self.current_mode != 'image' or self.current_file != image_path
+    
+    def _on_image_failed(self, image_path, message):
+        """图片处理失败（主线程）"""
+        self.image_worker_busy = False
+        if self._is_stale_image_result(image_path):
+            return
+        self._show_error("图片处理失败", message)
+    
+    def _on_image_processed(self, image_path, image, result_dict):
+        """图片处理完成（主线程）：显示结果并更新统计信息；结果已过期时丢弃，不覆盖当前显示"""
+        self.image_worker_busy = False
+        if self._is_stale_image_result(image_path):
+            print(f"丢弃过期的图片处理结果: {image_path}")
+            return
+        try:
             # 提取处理后的图像和统计信息
             if isinstance(result_dict, dict):
                 processed_image = result_dict.get('image', image)
@@ -1343,19 +1385,23 @@ class YOLOMainWindowLogic(QObject):
                 QMessageBox.warning(self.ui, "警告", "请先选择模型和模块类型！")
                 return False
             
-            # 模块映射
-            module_map = {
-                'analyzer': 'yolo_analyzer',
-                'classifier': 'yolo_classifier',
-                'keypoint': 'yolo_keypoint',
-                'Tracker': 'yolo_Tracker',
-            }
-            
-            if self.selected_module_type not in module_map:
+            if self.selected_module_type not in self.MODULE_MAP:
                 self._show_error("加载失败", f"未知的模块类型: {self.selected_module_type}")
                 return False
             
-            module_file = module_map[self.selected_module_type]
+            # 同一模型和模块已加载时直接复用，只同步界面参数（避免每次点击"开始"都重新加载权重和预热）
+            module_key = (self.model_path, self.selected_module_type)
+            if self.model_loaded and self.current_yolo_module is not None and self.loaded_module_key == module_key:
+                if hasattr(self.current_yolo_module, 'set_parameters'):
+                    params = self.right_panel.get_parameters()
+                    self.current_yolo_module.set_parameters(conf=params['confidence_threshold'],
+                                                            iou=params['iou_threshold'])
+                # 复用的跟踪器需清空上一段视频的轨迹和跟踪ID，保证每次会话从干净状态开始
+                if hasattr(self.current_yolo_module, 'reset_tracking'):
+                    self.current_yolo_module.reset_tracking()
+                return True
+            
+            module_file = self.MODULE_MAP[self.selected_module_type]
             
             # 动态导入模块
             try:
@@ -1382,6 +1428,7 @@ class YOLOMainWindowLogic(QObject):
                     )
                     
                     self.model_loaded = True
+                    self.loaded_module_key = module_key
                     
                     # 获取详细的模型信息
                     model_info = {}
@@ -1408,14 +1455,7 @@ class YOLOMainWindowLogic(QObject):
                     class_count = model_info.get('num_classes', '未知')
                     
                     # 更新UI显示详细模型信息
-                    module_display_names = {
-                        'analyzer': '目标检测',
-                        'classifier': '图像分类',
-                        'keypoint': '关键点检测',
-                        'Tracker': '目标跟踪'
-                    }
-                    
-                    display_name = module_display_names.get(self.selected_module_type, self.selected_module_type)
+                    display_name = self.MODULE_DISPLAY_NAMES.get(self.selected_module_type, self.selected_module_type)
                     self.right_panel.update_model_info(
                         model_path=self.model_path,
                         task_type=display_name,
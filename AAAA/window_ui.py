@@ -786,6 +786,9 @@ class YOLOMainWindowUI(QMainWindow):
         self.setWindowTitle("YOLO多功能检测系统")
         self.setGeometry(100, 100, 1140, 675)  # 初始窗口大小
         
+        self._file_menu = None  # 文件下拉菜单（首次点击时创建）
+        self._help_menu = None  # 帮助下拉菜单（首次点击时创建）
+        
         self._init_ui()        # 初始化主UI
         self._setup_toolbar()  # 设置工具栏
     
@@ -840,6 +843,7 @@ class YOLOMainWindowUI(QMainWindow):
         """)
         
         self.addToolBar(toolbar)
+        self._toolbar = toolbar
         
         # 创建工具栏按钮
         self.btn_file = QAction("文件", self)
@@ -872,53 +876,32 @@ class YOLOMainWindowUI(QMainWindow):
         toolbar.addWidget(spacer)
     
     def _show_file_menu(self):
-        """显示文件下拉菜单"""
-        file_menu = QMenu(self)
-        file_menu.addAction("初始化", self.file_menu_init.emit)
-        file_menu.addAction("另存为", self.file_menu_save_as.emit)
-        file_menu.addAction("保存", self.file_menu_save.emit)
-        file_menu.addSeparator()
-        file_menu.addAction("退出", self.file_menu_exit.emit)
-        
-        # 查找"文件"按钮位置并显示菜单
-        for action in self.findChildren(QAction):
-            if action.text() == "文件":
-                toolbar = self.findChild(QToolBar)
-                if toolbar:
-                    for act in toolbar.actions():
-                        if act.text() == "文件":
-                            tool_btn = toolbar.widgetForAction(act)
-                            if tool_btn:
-                                # 在按钮下方显示菜单
-                                pos = tool_btn.mapToGlobal(tool_btn.rect().bottomLeft())
-                                file_menu.exec_(pos)
-                                return
-        
-        #  fallback: 在窗口左上角显示
-        file_menu.exec_(self.mapToGlobal(self.rect().topLeft()))
+        """显示文件下拉菜单（菜单只创建一次，之后每次点击复用）"""
+        if self._file_menu is None:
+            self._file_menu = QMenu(self)
+            self._file_menu.addAction("初始化", self.file_menu_init.emit)
+            self._file_menu.addAction("另存为", self.file_menu_save_as.emit)
+            self._file_menu.addAction("保存", self.file_menu_save.emit)
+            self._file_menu.addSeparator()
+            self._file_menu.addAction("退出", self.file_menu_exit.emit)
+        self._popup_menu(self._file_menu, self.btn_file)
     
     def _show_help_menu(self):
-        """显示帮助下拉菜单"""
-        help_menu = QMenu(self)
-        help_menu.addAction("关于", self.help_menu_about.emit)
-        help_menu.addAction("使用说明", self.help_menu_manual.emit)
-        
-        # 查找"帮助"按钮位置并显示菜单
-        for action in self.findChildren(QAction):
-            if action.text() == "帮助":
-                toolbar = self.findChild(QToolBar)
-                if toolbar:
-                    for act in toolbar.actions():
-                        if act.text() == "帮助":
-                            tool_btn = toolbar.widgetForAction(act)
-                            if tool_btn:
-                                # 在按钮下方显示菜单
-                                pos = tool_btn.mapToGlobal(tool_btn.rect().bottomLeft())
-                                help_menu.exec_(pos)
-                                return
-        
-        # fallback: 在窗口左上角显示
-        help_menu.exec_(self.mapToGlobal(self.rect().topLeft()))
+        """显示帮助下拉菜单（菜单只创建一次，之后每次点击复用）"""
+        if self._help_menu is None:
+            self._help_menu = QMenu(self)
+            self._help_menu.addAction("关于", self.help_menu_about.emit)
+            self._help_menu.addAction("使用说明", self.help_menu_manual.emit)
+        self._popup_menu(self._help_menu, self.btn_help)
+    
+    def _popup_menu(self, menu, action):
+        """在工具栏按钮下方显示菜单"""
+        tool_btn = self._toolbar.widgetForAction(action)
+        if tool_btn:
+            menu.exec_(tool_btn.mapToGlobal(tool_btn.rect().bottomLeft()))
+        else:
+            # fallback: 在窗口左上角显示
+            menu.exec_(self.mapToGlobal(self.rect().topLeft()))
     
     # ===== 公共接口方法 =====
     
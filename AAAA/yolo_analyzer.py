@@ -9,8 +9,12 @@ YOLO分析器基类
 """
 
 import cv2
+import importlib.util
+import shutil
+import threading
 import numpy as np
 import torch
+from pathlib import Path
 from ultralytics import YOLO
 from typing import Union, List, Optional, Tuple, Dict, Any
 import time
@@ -19,6 +23,12 @@ import time
 class YOLOAnalyzer:
     """YOLO分析器基类 - 遵循老师要求的代码风格"""
     
+    # 无GPU时使用INT8量化的OpenVINO模型（需安装openvino并配置校准数据集，导出后缓存在权重文件旁边）
+    # 未配置 INT8_CALIB_DATA 时不启用：Ultralytics默认用COCO样本校准，会降低血细胞模型的精度
+    USE_INT8_ON_CPU = True
+    INT8_CALIB_DATA = None  # INT8校准数据集YAML（本项目血细胞数据的小型子集），None 时不使用INT8模型
+    _int8_exporting = set()  # 正在后台导出INT8模型的权重路径（所有实例共享）
+    
     def __init__(self, model_path: str = None, model_type: str = 'detect'):
         """
         初始化YOLO分析器
@@ -30,12 +40,14 @@ class YOLOAnalyzer:
         self.model = None
         self.model_type = model_type
         self.model_path = model_path
+        self.exported_model = False  # 是否为导出的模型（OpenVINO等，固定在CPU上运行，不能 .to()）
         
         # 推理参数
         self.conf = 0.25
         self.iou = 0.7
         self.img_size = 640
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.half = str(self.device).startswith('cuda')  # CUDA上使用FP16推理
         
         # 如果提供了模型路径，直接加载
         if model_path:
@@ -58,13 +70,23 @@ class YOLOAnalyzer:
             print(f"正在加载模型: {model_path}")
             
             # ✅ 老师的方式：直接创建YOLO对象，不使用predict
-            self.model = YOLO(model_path)
+            int8_path = self._cpu_int8_model_path(model_path)
+            if int8_path:
+                try:
+                    self.model = YOLO(int8_path)
+                except Exception as e:
+                    print(f"INT8模型加载失败，使用原始模型: {e}")
+                    int8_path = None
+            if int8_path is None:
+                self.model = YOLO(model_path)
+            self.exported_model = int8_path is not None
             
             if model_type:
                 self.model_type = model_type
             
-            # 移动到指定设备
-            self.model.to(self.device)
+            # 移动到指定设备（导出的OpenVINO模型固定在CPU上运行）
+            if not self.exported_model:
+                self.model.to(self.device)
             
             # 根据模型类型调整默认参数
             self._adjust_params_by_type()
@@ -76,6 +98,53 @@ class YOLOAnalyzer:
             print(f"❌ 模型加载失败: {e}")
             return False
     
+    def _cpu_int8_model_path(self, model_path: str) -> Optional[str]:
+        """
+        CPU推理时返回INT8量化的OpenVINO模型目录；尚未导出或已过期时在后台导出，本次返回None
+        
+        Args:
+            model_path: PyTorch 权重文件路径
+            
+        Returns:
+            Optional[str]: OpenVINO模型目录，不适用或尚无可用的导出结果时返回None
+        """
+        if (not self.USE_INT8_ON_CPU or not self.INT8_CALIB_DATA or str(self.device) != 'cpu'
+                or not model_path.endswith('.pt') or importlib.util.find_spec('openvino') is None):
+            return None
+        
+        # 导出目录比权重文件旧，说明权重已被替换，缓存失效
+        int8_dir = Path(model_path).with_name(f"{Path(model_path).stem}_int8_openvino_model")
+        if int8_dir.exists() and int8_dir.stat().st_mtime >= Path(model_path).stat().st_mtime:
+            return str(int8_dir)
+        
+        # 导出和校准耗时较长，在后台线程进行，不阻塞界面；本次使用原始模型，导出完成后下次加载生效
+        if model_path not in self._int8_exporting:
+            self._int8_exporting.add(model_path)
+            threading.Thread(target=self._export_int8, args=(model_path, int8_dir)).start()
+        return None
+    
+    def _export_int8(self, model_path: str, int8_dir: Path):
+        """导出INT8 OpenVINO模型（在后台线程中执行），过期的导出目录先删除"""
+        try:
+            print("后台导出INT8 OpenVINO模型（完成后下次加载模型时生效）...")
+            if int8_dir.exists():
+                shutil.rmtree(int8_dir)
+            YOLO(model_path).export(format='openvino', int8=True, imgsz=self.img_size,
+                                    data=self.INT8_CALIB_DATA)
+            print(f"INT8模型导出完成: {int8_dir}")
+        except Exception as e:
+            print(f"INT8模型导出失败，继续使用原始模型: {e}")
+        finally:
+            self._int8_exporting.discard(model_path)
+    
+    def warmup(self):
+        """用空白图像推理一次，使Predictor构建、层融合和CUDA内核初始化发生在加载时，而不是第一帧"""
+        try:
+            dummy = np.zeros((self.img_size, self.img_size, 3), dtype=np.uint8)
+            self.inference(dummy)
+        except Exception as e:
+            print(f"模型预热失败: {e}")
+    
     def _adjust_params_by_type(self):
         """根据模型类型调整默认参数"""
         if self.model_type == 'pose':
@@ -210,7 +279,9 @@ class YOLOAnalyzer:
             self.img_size = img_size
         if device is not None:
             self.device = device
-            if self.model:
+            self.half = str(device).startswith('cuda')
+            # 导出的模型（OpenVINO）不是PyTorch模块，不能移动设备
+            if self.model and not self.exported_model:
                 self.model.to(device)
     
     def get_model_info(self) -> Dict[str, Any]:
@@ -17,6 +17,10 @@ class YOLOClassifier(YOLOAnalyzer):
         """初始化分类器"""
         super().__init__(model_path, model_type='classify')
         self.top_k = 5  # 显示前K个类别
+        
+        # 预热：提前构建Predictor，第一张图片不再承担初始化开销
+        if self.model is not None:
+            self.warmup()
     
     def inference(self, input_data: Union[str, np.ndarray], 
                   conf: float = None, iou: float = None, **kwargs) -> Any:
@@ -39,6 +43,7 @@ class YOLOClassifier(YOLOAnalyzer):
             input_data,
             conf=conf,
             imgsz=self.img_size,
+            half=self.half,
             verbose=False
         )
         
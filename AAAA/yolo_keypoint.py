@@ -13,6 +13,11 @@ from yolo_analyzer import YOLOAnalyzer
 class YOLOKeypoint(YOLOAnalyzer):
     """YOLO关键点检测器 - 专门用于姿态估计"""
     
+    # 标签字体样式
+    _LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+    _LABEL_SCALE = 0.5
+    _LABEL_THICKNESS = 2
+    
     def __init__(self, model_path: str = None):
         """初始化关键点检测器"""
         super().__init__(model_path, model_type='pose')
@@ -27,6 +32,15 @@ class YOLOKeypoint(YOLOAnalyzer):
             (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0),
             (255, 0, 255), (0, 255, 255), (128, 0, 0), (0, 128, 0)
         ]
+        # 每条骨架连接的颜色只算一次，绘制时不再逐人逐连接取模查表
+        self._skeleton_segments = [
+            (start_idx, end_idx, self.skeleton_colors[start_idx % len(self.skeleton_colors)])
+            for start_idx, end_idx in self.skeleton_connections
+        ]
+        
+        # 预热：提前构建Predictor，第一帧不再承担初始化开销
+        if self.model is not None:
+            self.warmup()
     
     def inference(self, input_data: Union[str, np.ndarray], 
                   conf: float = None, iou: float = None, **kwargs) -> Any:
@@ -51,6 +65,7 @@ class YOLOKeypoint(YOLOAnalyzer):
             conf=conf,
             iou=iou,
             imgsz=self.img_size,
+            half=self.half,
             verbose=False
         )
         
@@ -88,14 +103,16 @@ class YOLOKeypoint(YOLOAnalyzer):
                 'num_keypoints': 0
             }
         
-        # 提取边界框
-        boxes = result.boxes.xyxy.cpu().numpy() if result.boxes.xyxy is not None else []
-        confidences = result.boxes.conf.cpu().numpy() if result.boxes.conf is not None else []
-        class_ids = result.boxes.cls.cpu().numpy().astype(int) if result.boxes.cls is not None else []
+        # 提取边界框：整块拷贝到CPU一次（[x1,y1,x2,y2,(id,)conf,cls]），不再逐个属性各同步一次
+        box_data = result.boxes.data.cpu().numpy()
+        boxes = box_data[:, :4]
+        confidences = box_data[:, -2]
+        class_ids = box_data[:, -1].astype(int)
         
-        # 提取关键点
-        keypoints = result.keypoints.xy.cpu().numpy() if result.keypoints.xy is not None else []
-        keypoints_conf = result.keypoints.conf.cpu().numpy() if result.keypoints.conf is not None else []
+        # 提取关键点：data 为 [x, y, (conf)]，同样一次拷贝
+        kpt_data = result.keypoints.data.cpu().numpy()
+        keypoints = kpt_data[..., :2]
+        keypoints_conf = kpt_data[..., 2] if kpt_data.shape[-1] == 3 else []
         
         # 提取类别名称
         class_names = []
@@ -105,21 +122,17 @@ class YOLOKeypoint(YOLOAnalyzer):
             else:
                 class_names.append(f"person_{cls_id}")
         
-        # 构建详细的关键点信息
-        detailed_keypoints = []
-        for i in range(len(keypoints)):
-            person_kps = []
-            for j in range(len(keypoints[i])):
-                kp = keypoints[i][j]
-                conf = keypoints_conf[i][j] if j < len(keypoints_conf[i]) else 0.0
-                person_kps.append({
-                    'id': j,
-                    'x': float(kp[0]),
-                    'y': float(kp[1]),
-                    'confidence': float(conf),
-                    'visible': conf > 0.1
-                })
-            detailed_keypoints.append(person_kps)
+        # 构建详细的关键点信息：坐标和置信度整体转为Python列表一次，循环内不再逐元素转换numpy标量
+        kps_list = keypoints.tolist()
+        if len(keypoints_conf) > 0:
+            conf_list = keypoints_conf.tolist()
+        else:
+            conf_list = np.zeros(keypoints.shape[:2]).tolist()
+        detailed_keypoints = [
+            [{'id': j, 'x': x, 'y': y, 'confidence': conf, 'visible': conf > 0.1}
+             for j, ((x, y), conf) in enumerate(zip(person_xy, person_conf))]
+            for person_xy, person_conf in zip(kps_list, conf_list)
+        ]
         
         return {
             'boxes': boxes.tolist() if isinstance(boxes, np.ndarray) else boxes,
@@ -191,7 +204,7 @@ class YOLOKeypoint(YOLOAnalyzer):
                     conf = results['confidences'][person_idx]
                     label = f"Person {person_idx+1}: {conf:.2f}"
                     cv2.putText(vis_img, label, (x1, y1 - 10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+                               self._LABEL_FONT, self._LABEL_SCALE, (0, 255, 0), self._LABEL_THICKNESS)
             
             # 获取关键点
             if len(results['keypoints']) > person_idx:
@@ -199,14 +212,13 @@ class YOLOKeypoint(YOLOAnalyzer):
                 
                 if draw_skeleton:
                     # 绘制骨架连接
-                    for connection in self.skeleton_connections:
-                        start_idx, end_idx = connection
-                        if (start_idx < len(keypoints) and end_idx < len(keypoints)):
+                    num_kps = len(keypoints)
+                    for start_idx, end_idx, color in self._skeleton_segments:
+                        if start_idx < num_kps and end_idx < num_kps:
                             start_kp = keypoints[start_idx]
                             end_kp = keypoints[end_idx]
                             
                             if start_kp['visible'] and end_kp['visible']:
-                                color = self.skeleton_colors[connection[0] % len(self.skeleton_colors)]
                                 cv2.line(vis_img, 
                                         (int(start_kp['x']), int(start_kp['y'])),
                                         (int(end_kp['x']), int(end_kp['y'])),
@@ -4,7 +4,11 @@ YOLO 目标检测
 """
 
 import cv2
+import time
+import queue
+import threading
 import numpy as np
+from collections import deque
 from pathlib import Path
 from typing import Union, Dict, Any, List, Optional
 from yolo_analyzer import YOLOAnalyzer
@@ -13,14 +17,73 @@ from yolo_analyzer import YOLOAnalyzer
 class YOLOTracker(YOLOAnalyzer):
     """YOLO目标跟踪器 - 专门用于目标检测和跟踪"""
     
-    def __init__(self, model_path: str = None, tracker_config: str = "bytetrack.yaml"):
-        """初始化跟踪器"""
+    # 轨迹颜色表（BGR），按 track_id % 10 取色
+    _PALETTE = np.array([
+        (255, 0, 0),    # 蓝色
+        (0, 255, 0),    # 绿色
+        (0, 0, 255),    # 红色
+        (255, 255, 0),  # 青色
+        (255, 0, 255),  # 紫色
+        (0, 255, 255),  # 黄色
+        (128, 0, 0),    # 深蓝
+        (0, 128, 0),    # 深绿
+        (0, 0, 128),    # 深红
+        (128, 128, 0),  # 橄榄色
+    ], dtype=np.uint8)
+    
+    # 轨迹线宽查找表：第j段线宽为 int(sqrt(32 / (j + 1)) * 2)
+    _TRAIL_THICKNESS = (np.sqrt(32.0 / (np.arange(256) + 1)) * 2).astype(np.int32)
+    
+    # 标签字体样式
+    _LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+    _LABEL_SCALE = 0.5
+    _LABEL_THICKNESS = 2
+    _TEXT_SIZE_CACHE_LIMIT = 1024  # 文字尺寸缓存上限
+    
+    # 只检测和跟踪的类别名称（如 ['platelet', 'lymphocyte']），None 表示全部类别
+    TARGET_CLASSES = None
+    
+    def __init__(self, model_path: str = None, tracker_config: str = "bytetrack.yaml",
+                 target_classes: Optional[List[str]] = None):
+        """
+        初始化跟踪器
+        
+        Args:
+            model_path: 模型文件路径
+            tracker_config: 跟踪器配置文件
+            target_classes: 只保留的类别名称列表，None 时使用 TARGET_CLASSES
+        """
         super().__init__(model_path, model_type='track')
         self.tracker_config = tracker_config
         self.persist_tracks = True
         self.track_history = {}  # 跟踪历史记录
         self.max_history_length = 50  # 最大历史长度
-        self.track_colors = {}  # 为每个track_id分配颜色
+        self._text_size_cache = {}  # 标签文字尺寸缓存
+        self._names_arr = None  # 类别名称查找表（首次后处理时构建）
+        self.class_ids = None  # 只保留的类别ID（None 表示全部类别，见 set_target_classes）
+        self.set_target_classes(target_classes if target_classes is not None else self.TARGET_CLASSES)
+        
+        # 预热（默认 track 模式）：提前构建Predictor和跟踪器，后续每帧调用直接复用
+        if self.model is not None:
+            self.warmup()
+    
+    def set_target_classes(self, class_names: Optional[List[str]] = None):
+        """
+        设置只保留的类别：推理时作为 classes 参数传给模型，在GPU上的NMS阶段即丢弃其他类别，
+        不会被拷贝到CPU、跟踪或绘制
+        
+        Args:
+            class_names: 类别名称列表，None 表示保留全部类别
+        """
+        if class_names is None or self.model is None:
+            self.class_ids = None
+            return
+        
+        wanted = set(class_names)
+        unknown = wanted - set(self.model.names.values())
+        if unknown:
+            print(f"模型中没有这些类别，已忽略: {sorted(unknown)}")
+        self.class_ids = [idx for idx, name in self.model.names.items() if name in wanted]
     
     def inference(self, input_data: Union[str, np.ndarray], 
                   conf: float = None, iou: float = None, 
@@ -50,6 +113,8 @@ class YOLOTracker(YOLOAnalyzer):
                 imgsz=self.img_size,
                 tracker=self.tracker_config,
                 persist=self.persist_tracks,
+                half=self.half,
+                classes=self.class_ids,
                 verbose=False
             )
         else:
@@ -59,6 +124,8 @@ class YOLOTracker(YOLOAnalyzer):
                 conf=conf,
                 iou=iou,
                 imgsz=self.img_size,
+                half=self.half,
+                classes=self.class_ids,
                 verbose=False
             )
         
@@ -75,103 +142,74 @@ class YOLOTracker(YOLOAnalyzer):
         Returns:
             Dict: 处理后的结果
         """
-        if len(results) == 0:
-            return {
-                'boxes': [],
-                'track_ids': [],
-                'confidences': [],
-                'class_ids': [],
-                'class_names': [],
-                'num_detections': 0,
-                'mode': 'track'
-            }
-        
-        # 获取第一个结果
-        result = results[0]
-        
-        if result.boxes is None:
-            return {
-                'boxes': [],
-                'track_ids': [],
-                'confidences': [],
-                'class_ids': [],
-                'class_names': [],
-                'num_detections': 0,
-                'mode': 'track'
-            }
-        
-        # 提取边界框
-        boxes = result.boxes.xyxy.cpu().numpy() if result.boxes.xyxy is not None else []
-        confidences = result.boxes.conf.cpu().numpy() if result.boxes.conf is not None else []
-        class_ids = result.boxes.cls.cpu().numpy().astype(int) if result.boxes.cls is not None else []
-        
-        # 提取track_id（如果是跟踪模式）
-        track_ids = []
-        if hasattr(result.boxes, 'id') and result.boxes.id is not None:
-            track_ids = result.boxes.id.cpu().numpy().astype(int)
-        
-        # 提取类别名称
-        class_names = []
-        for cls_id in class_ids:
-            if hasattr(result, 'names') and cls_id < len(result.names):
-                class_names.append(result.names[cls_id])
-            else:
-                class_names.append(f"object_{cls_id}")
+        # 无结果或无检测框时直接返回空结果
+        result = results[0] if len(results) > 0 else None
+        if result is None or result.boxes is None or len(result.boxes) == 0:
+            return self._empty_result()
+        
+        # 一次性拷贝到CPU：跟踪模式为 [x1,y1,x2,y2,id,conf,cls]，检测模式为 [x1,y1,x2,y2,conf,cls]
+        data = result.boxes.data.cpu().numpy()
+        boxes = data[:, :4]
+        confidences = data[:, -2]
+        class_ids = data[:, -1].astype(int)
+        track_ids = data[:, 4].astype(int) if result.boxes.is_track else np.empty(0, dtype=int)
+        
+        # 提取类别名称（名称表按模型缓存，一次花式索引）
+        if self._names_arr is None or len(self._names_arr) != len(result.names):
+            self._names_arr = np.array([result.names[i] for i in range(len(result.names))], dtype=object)
+        class_names = self._names_arr[class_ids].tolist()
         
         # 更新跟踪历史
         self._update_track_history(track_ids, boxes)
         
-        # 为新的track_id分配颜色
-        self._assign_track_colors(track_ids)
-        
         return {
-            'boxes': boxes.tolist() if isinstance(boxes, np.ndarray) else boxes,
-            'track_ids': track_ids.tolist() if isinstance(track_ids, np.ndarray) else track_ids,
-            'confidences': confidences.tolist() if isinstance(confidences, np.ndarray) else confidences,
-            'class_ids': class_ids.tolist() if isinstance(class_ids, np.ndarray) else class_ids,
+            'boxes': boxes,
+            'track_ids': track_ids,
+            'confidences': confidences,
+            'class_ids': class_ids,
             'class_names': class_names,
             'num_detections': len(boxes),
-            'mode': 'track' if len(track_ids) > 0 else 'detect',
-            'track_history': self.track_history.copy()
+            'mode': 'track' if len(track_ids) > 0 else 'detect'
+        }
+    
+    @staticmethod
+    def _empty_result() -> Dict[str, Any]:
+        """无检测时的结果：每次新建数组，类型与有检测时一致，调用方修改不会影响之后的结果"""
+        return {
+            'boxes': np.empty((0, 4), dtype=np.float32),
+            'track_ids': np.empty(0, dtype=int),
+            'confidences': np.empty(0, dtype=np.float32),
+            'class_ids': np.empty(0, dtype=int),
+            'class_names': [],
+            'num_detections': 0,
+            'mode': 'track'
         }
     
     def _update_track_history(self, track_ids: List[int], boxes: List):
         """更新跟踪历史记录"""
-        for i, track_id in enumerate(track_ids):
-            if i < len(boxes):
-                box = boxes[i]
-                center_x = int((box[0] + box[2]) / 2)
-                center_y = int((box[1] + box[3]) / 2)
-                center = (center_x, center_y)
-                
-                if track_id not in self.track_history:
-                    self.track_history[track_id] = []
-                
-                self.track_history[track_id].append(center)
-                
-                # 限制历史记录长度
-                if len(self.track_history[track_id]) > self.max_history_length:
-                    self.track_history[track_id].pop(0)
+        if len(track_ids) == 0 or len(boxes) == 0:
+            return
+        
+        # 一次性计算所有框的中心点
+        boxes = np.asarray(boxes)[:len(track_ids)]
+        centers = ((boxes[:, :2] + boxes[:, 2:4]) * 0.5).astype(np.int32)
+        
+        for track_id, (center_x, center_y) in zip(map(int, track_ids), centers):
+            # deque(maxlen) 自动丢弃最旧的点，限制历史记录长度
+            history = self.track_history.get(track_id)
+            if history is None:
+                history = self.track_history[track_id] = deque(maxlen=self.max_history_length)
+            history.append((int(center_x), int(center_y)))
     
-    def _assign_track_colors(self, track_ids: List[int]):
-        """为每个track_id分配颜色"""
-        colors = [
-            (255, 0, 0),    # 蓝色
-            (0, 255, 0),    # 绿色
-            (0, 0, 255),    # 红色
-            (255, 255, 0),  # 青色
-            (255, 0, 255),  # 紫色
-            (0, 255, 255),  # 黄色
-            (128, 0, 0),    # 深蓝
-            (0, 128, 0),    # 深绿
-            (0, 0, 128),    # 深红
-            (128, 128, 0),  # 橄榄色
-        ]
-        
-        for track_id in track_ids:
-            if track_id not in self.track_colors:
-                color_idx = track_id % len(colors)
-                self.track_colors[track_id] = colors[color_idx]
+    def _get_text_size(self, label: str):
+        """获取标签文字尺寸（带缓存，相同标签不重复计算）"""
+        size = self._text_size_cache.get(label)
+        if size is None:
+            if len(self._text_size_cache) >= self._TEXT_SIZE_CACHE_LIMIT:
+                self._text_size_cache.clear()
+            size = cv2.getTextSize(label, self._LABEL_FONT, self._LABEL_SCALE, self._LABEL_THICKNESS)[0]
+            self._text_size_cache[label] = size
+        return size
     
     def detect_objects(self, image_path: str, conf: float = None) -> Dict[str, Any]:
         """
@@ -212,7 +250,7 @@ class YOLOTracker(YOLOAnalyzer):
         
         if results['num_detections'] > 0:
             print(f"跟踪到 {results['num_detections']} 个物体")
-            if results['track_ids']:
+            if len(results['track_ids']) > 0:
                 unique_ids = set(results['track_ids'])
                 print(f"  唯一ID数量: {len(unique_ids)}")
         else:
@@ -220,18 +258,45 @@ class YOLOTracker(YOLOAnalyzer):
         
         return results
     
+    def _open_video_capture(self, video_path: str):
+        """打开视频：优先使用FFMPEG后端并请求硬件解码，失败时回退到默认后端"""
+        cap = None
+        try:
+            if hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):  # OpenCV >= 4.5.2
+                cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG,
+                                       [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+            else:
+                cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+        except Exception:
+            cap = None
+        
+        if cap is None or not cap.isOpened():
+            cap = cv2.VideoCapture(video_path)
+        
+        # 尝试设置较小的内部缓冲（部分后端支持）
+        try:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 3)
+        except Exception:
+            pass
+        
+        return cap
+    
     def track_video(self, video_path: str, output_path: str = None, 
-                   conf: float = None, show: bool = True):
+                   conf: float = None, show: bool = True, prefetch: int = 8):
         """
         跟踪视频中的物体
         
+        读取、跟踪、写入分为三个阶段：读取线程解码帧，主线程跟踪和绘制，
+        写入线程编码输出，阶段之间用有界队列衔接
+        
         Args:
             video_path: 视频路径
             output_path: 输出视频路径
             conf: 置信度阈值
             show: 是否实时显示
+            prefetch: 队列容量（预读帧数）
         """
-        cap = cv2.VideoCapture(video_path)
+        cap = self._open_video_capture(video_path)
         if not cap.isOpened():
             print(f"无法打开视频: {video_path}")
             return
@@ -253,58 +318,126 @@ class YOLOTracker(YOLOAnalyzer):
         print(f"开始处理视频: {video_path}")
         print(f"视频信息: {width}x{height}, {fps}FPS")
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame_count += 1
-            
-            # 跟踪当前帧
-            start_time = time.time()
-            results = self.track_objects(frame, conf=conf)
-            frame_time = time.time() - start_time
-            total_time += frame_time
-            
-            # 可视化结果
-            vis_frame = self.visualize_tracking(frame, results)
-            
-            # 显示帧率信息
-            fps_text = f"FPS: {1/frame_time:.1f}" if frame_time > 0 else "FPS: N/A"
-            cv2.putText(vis_frame, fps_text, (10, height - 20), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-            
-            # 显示处理进度
-            progress = f"Frame: {frame_count}"
-            cv2.putText(vis_frame, progress, (10, height - 50), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-            
-            # 显示或保存
-            if show:
-                cv2.imshow('YOLO Tracking', vis_frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+        read_q = queue.Queue(maxsize=prefetch)
+        write_q = queue.Queue(maxsize=prefetch)
+        stop_event = threading.Event()
+        
+        def _put(q, item):
+            """放入队列，停止时放弃等待"""
+            while not stop_event.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def _reader():
+            """读取线程：解码帧（出错时也放入结束标记，主线程不会一直等待）"""
+            idx = 0
+            try:
+                while not stop_event.is_set():
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    idx += 1
+                    if not _put(read_q, (idx, frame)):
+                        break
+            except Exception as e:
+                print(f"读取视频帧出错: {e}")
+            finally:
+                _put(read_q, None)
+        
+        def _writer():
+            """写入线程：编码输出；写入出错后通知主线程停止，但继续取出队列中的帧直到结束标记，避免放入方阻塞"""
+            failed = False
+            while True:
+                item = write_q.get()
+                if item is None:
+                    break
+                if failed:
+                    continue
+                try:
+                    writer.write(item)
+                except Exception as e:
+                    print(f"写入视频帧出错: {e}")
+                    failed = True
+                    stop_event.set()
+        
+        reader_thread = threading.Thread(target=_reader, daemon=True)
+        reader_thread.start()
+        writer_thread = None
+        if writer:
+            writer_thread = threading.Thread(target=_writer, daemon=True)
+            writer_thread.start()
+        
+        try:
+            # 跟踪器有状态，始终在主线程中运行
+            while True:
+                try:
+                    item = read_q.get(timeout=0.1)
+                except queue.Empty:
+                    if stop_event.is_set():
+                        break
+                    continue
+                if item is None:
+                    break
+                
+                frame_count, frame = item
+                
+                # 跟踪当前帧（直接调用 process：track_objects 每帧打印检测数并统计唯一ID，视频循环只需结果用于绘制）
+                start_time = time.time()
+                results = self.process(frame, conf=conf, mode='track')
+                frame_time = time.time() - start_time
+                total_time += frame_time
+                
+                # 可视化结果
+                vis_frame = self.visualize_tracking(frame, results, inplace=True)
+                
+                # 显示帧率信息
+                fps_text = f"FPS: {1/frame_time:.1f}" if frame_time > 0 else "FPS: N/A"
+                cv2.putText(vis_frame, fps_text, (10, height - 20), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                
+                # 显示处理进度
+                progress = f"Frame: {frame_count}"
+                cv2.putText(vis_frame, progress, (10, height - 50), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                
+                # 显示或保存（写入线程出错停止时放弃）
+                if writer and not _put(write_q, vis_frame):
                     break
+                
+                if show:
+                    cv2.imshow('YOLO Tracking', vis_frame)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+                
+                # 每100帧打印一次进度
+                if frame_count % 100 == 0:
+                    avg_time = total_time / frame_count
+                    print(f"已处理 {frame_count} 帧，平均每帧 {avg_time:.3f}秒")
+        
+        finally:
+            # 无论正常结束还是出错，都停止读取线程、等待写入线程写完剩余帧并释放资源
+            stop_event.set()
+            reader_thread.join()
+            if writer_thread:
+                write_q.put(None)  # 写入线程始终取队列直到结束标记，这里不会永久阻塞
+                writer_thread.join()
             
+            cap.release()
             if writer:
-                writer.write(vis_frame)
-            
-            # 每100帧打印一次进度
-            if frame_count % 100 == 0:
-                avg_time = total_time / frame_count
-                print(f"已处理 {frame_count} 帧，平均每帧 {avg_time:.3f}秒")
-        
-        cap.release()
-        if writer:
-            writer.release()
-        if show:
-            cv2.destroyAllWindows()
+                writer.release()
+            if show:
+                cv2.destroyAllWindows()
         
         print(f"视频处理完成，共处理 {frame_count} 帧")
         if frame_count > 0:
             print(f"平均处理速度: {frame_count/total_time:.1f} FPS")
     
     def visualize_tracking(self, image: np.ndarray, results: Dict[str, Any], 
-                          draw_trails: bool = True) -> np.ndarray:
+                          draw_trails: bool = True, inplace: bool = False) -> np.ndarray:
         """
         可视化跟踪结果
         
@@ -312,76 +445,83 @@ class YOLOTracker(YOLOAnalyzer):
             image: 原始图像
             results: 跟踪结果
             draw_trails: 是否绘制轨迹
+            inplace: 是否直接在原图上绘制（调用方不再需要原图时可省去一次拷贝）
             
         Returns:
             np.ndarray: 可视化图像
         """
-        vis_img = image.copy()
+        vis_img = image if inplace else image.copy()
         
         if results['num_detections'] == 0:
             cv2.putText(vis_img, "No Objects Detected", (10, 30), 
                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
             return vis_img
         
-        # 绘制检测框和轨迹
-        for i in range(results['num_detections']):
-            # 获取检测信息
-            box = results['boxes'][i]
-            x1, y1, x2, y2 = map(int, box[:4])
-            
-            # 获取或分配颜色
-            track_id = None
-            if i < len(results['track_ids']):
-                track_id = results['track_ids'][i]
-                color = self.track_colors.get(track_id, (0, 255, 0))
-            else:
-                color = (0, 255, 0)  # 默认为绿色
-            
-            # 绘制边界框
-            cv2.rectangle(vis_img, (x1, y1), (x2, y2), color, 2)
+        # 绘制检测框和轨迹：坐标、颜色、标签整体转换一次，循环内只做绘制
+        num = results['num_detections']
+        boxes_arr = np.asarray(results['boxes'])[:num, :4].astype(np.int32)
+        boxes_int = boxes_arr.tolist()
+        track_ids = [int(t) for t in results['track_ids'][:num]]
+        colors = self._PALETTE[np.asarray(track_ids, dtype=np.int64) % len(self._PALETTE)].tolist()
+        colors += [[0, 255, 0]] * (num - len(colors))  # 无跟踪ID时默认为绿色
+        class_names = list(results['class_names'][:num])
+        class_names += ["object"] * (num - len(class_names))
+        confidences = [float(c) for c in results['confidences'][:num]]
+        confidences += [0.0] * (num - len(confidences))
+        
+        # 绘制边界框：按颜色分组，每种颜色一次 polylines 调用画出全部矩形框
+        x1s, y1s, x2s, y2s = boxes_arr.T
+        corners = np.stack([np.stack([x1s, y1s], 1), np.stack([x2s, y1s], 1),
+                            np.stack([x2s, y2s], 1), np.stack([x1s, y2s], 1)], axis=1)
+        boxes_by_color = {}
+        for i, color in enumerate(colors):
+            boxes_by_color.setdefault(tuple(color), []).append(i)
+        for color, idxs in boxes_by_color.items():
+            cv2.polylines(vis_img, list(corners[idxs]), True, color, 2)
+        
+        for i, ((x1, y1, x2, y2), color, class_name, confidence) in enumerate(
+                zip(boxes_int, colors, class_names, confidences)):
+            color = tuple(color)
             
             # 准备标签
-            class_name = results['class_names'][i] if i < len(results['class_names']) else f"object"
-            confidence = results['confidences'][i] if i < len(results['confidences']) else 0.0
-            
-            if track_id is not None:
-                label = f"ID:{track_id} {class_name} {confidence:.2f}"
+            if i < len(track_ids):
+                label = f"ID:{track_ids[i]} {class_name} {confidence:.2f}"
             else:
                 label = f"{class_name} {confidence:.2f}"
             
             # 绘制标签背景
-            (text_width, text_height), baseline = cv2.getTextSize(
-                label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2
-            )
+            text_width, text_height = self._get_text_size(label)
             cv2.rectangle(vis_img, (x1, y1 - text_height - 10), 
                          (x1 + text_width, y1), color, -1)
             
             # 绘制标签
             cv2.putText(vis_img, label, (x1, y1 - 5), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+                       self._LABEL_FONT, self._LABEL_SCALE, (255, 255, 255), self._LABEL_THICKNESS)
             
             # 绘制中心点
-            center_x = (x1 + x2) // 2
-            center_y = (y1 + y2) // 2
-            cv2.circle(vis_img, (center_x, center_y), 3, color, -1)
+            cv2.circle(vis_img, ((x1 + x2) // 2, (y1 + y2) // 2), 3, color, -1)
         
         # 绘制轨迹
-        if draw_trails and 'track_history' in results:
-            for track_id, history in results['track_history'].items():
-                if track_id in self.track_colors:
-                    color = self.track_colors[track_id]
-                    
-                    # 绘制轨迹线
-                    for j in range(1, len(history)):
-                        if history[j-1] is None or history[j] is None:
-                            continue
-                        
-                        thickness = int(np.sqrt(32 / float(j + 1)) * 2)
-                        cv2.line(vis_img, history[j-1], history[j], color, thickness)
+        if draw_trails:
+            for track_id, history in self.track_history.items():
+                if len(history) < 2:
+                    continue
+                color = tuple(int(x) for x in self._PALETTE[track_id % len(self._PALETTE)])
+                pts = np.asarray(history, dtype=np.int32)
+                
+                # 绘制轨迹线：第j段线宽查表，线宽相同的连续段合并为一次 polylines 调用
+                idx = np.minimum(np.arange(1, len(pts)), len(self._TRAIL_THICKNESS) - 1)
+                thickness = self._TRAIL_THICKNESS[idx]
+                bounds = np.flatnonzero(np.diff(thickness)) + 1
+                starts = np.concatenate(([0], bounds))
+                ends = np.concatenate((bounds, [len(thickness)]))
+                for start, end in zip(starts, ends):
+                    cv2.polylines(vis_img, [pts[start:end + 1].reshape(-1, 1, 2)], False,
+                                  color, int(thickness[start]))
         
         # 添加统计信息
         stats_text = f"Objects: {results['num_detections']}"
-        if results['track_ids']:
+        if len(results['track_ids']) > 0:
             unique_ids = set(results['track_ids'])
             stats_text += f" | Tracks: {len(unique_ids)}"
         
@@ -398,4 +538,10 @@ class YOLOTracker(YOLOAnalyzer):
     def clear_history(self):
         """清除跟踪历史"""
         self.track_history.clear()
-        self.track_colors.clear()
\ No newline at end of file
+    
+    def reset_tracking(self):
+        """重置跟踪状态：清除轨迹历史，并重置Ultralytics跟踪器（含轨迹ID计数），用于开始新的视频/摄像头会话"""
+        self.clear_history()
+        predictor = getattr(self.model, 'predictor', None) if self.model is not None else None
+        for tracker in getattr(predictor, 'trackers', None) or []:
+            tracker.reset()
\ No newline at end of file
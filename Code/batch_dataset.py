@@ -1,13 +1,16 @@
 import os
-import shutil
 import random
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List
+from file_utils import link_or_copy
 
 # ================================================================================
 # 配置参数
 EXTRACT_COUNT = 200      # 每个类别提取总数
 MIN_PER_TYPE = 40        # 每个子类型最少数量
+COPY_WORKERS = 8         # 并行链接/复制线程数
 CELL_TYPES = [
     "basophil", "eosinophil", "erythroblast", "ig", 
     "lymphocyte", "monocyte", "neutrophil", "platelet"
@@ -39,37 +42,28 @@ class ImageExtractor:
         """分配数量：先各分MIN_PER_TYPE张，剩余按比例分配"""
         print(f"  分配策略: 先各分{MIN_PER_TYPE}张，剩余按比例分配")
         
-        allocations = {}
-        # 1. 先分最低保障
-        for subtype, imgs in groups.items():
-            allocations[subtype] = min(MIN_PER_TYPE, len(imgs))
+        subtypes = list(groups)
+        counts = np.array([len(groups[s]) for s in subtypes])
         
-        used = sum(allocations.values())
-        remaining = EXTRACT_COUNT - used
+        # 1. 先分最低保障
+        alloc = np.minimum(MIN_PER_TYPE, counts)
+        remaining = EXTRACT_COUNT - int(alloc.sum())
         
-        # 2. 剩余按比例分
+        # 2. 剩余按比例分（不超过各子类型剩余容量）
         if remaining > 0:
-            original_counts = {s: len(imgs) for s, imgs in groups.items()}
-            total_original = sum(original_counts.values())
-            
-            for subtype in groups:
-                if allocations[subtype] < len(groups[subtype]):
-                    extra = int(remaining * original_counts[subtype] / total_original)
-                    capacity = len(groups[subtype]) - allocations[subtype]
-                    actual_extra = min(extra, capacity, remaining)
-                    
-                    if actual_extra > 0:
-                        allocations[subtype] += actual_extra
-                        remaining -= actual_extra
-        
-        # 3. 处理取整剩余
+            extra = np.floor(remaining * counts / counts.sum()).astype(int)
+            extra = np.minimum(extra, counts - alloc)
+            alloc += extra
+            remaining -= int(extra.sum())
+        
+        # 3. 处理取整剩余：按剩余容量从大到小，每个子类型最多补1张
         if remaining > 0:
-            for subtype in sorted(groups, key=lambda x: len(groups[x]) - allocations[x], reverse=True):
-                if remaining <= 0: break
-                capacity = len(groups[subtype]) - allocations[subtype]
-                if capacity > 0:
-                    allocations[subtype] += 1
-                    remaining -= 1
+            capacity = counts - alloc
+            order = np.argsort(-capacity, kind='stable')
+            order = order[capacity[order] > 0][:remaining]
+            alloc[order] += 1
+        
+        allocations = {s: int(n) for s, n in zip(subtypes, alloc)}
         
         # 打印结果
         total = sum(allocations.values())
@@ -122,9 +116,9 @@ class ImageExtractor:
             for subtype, count in allocations.items():
                 selected.extend(random.sample(groups[subtype], count))
         
-        # 复制图片
-        for img in selected:
-            shutil.copy2(img, dst_path / img.name)
+        # 放置图片（小数据集只作训练输入，优先硬链接；I/O密集，多线程并行）
+        with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+            list(executor.map(lambda img: link_or_copy(img, dst_path / img.name), selected))
         
         print(f"  ✅ 完成: 复制{len(selected)}张图片")
         return len(selected)
@@ -0,0 +1,41 @@
+# 数据集准备脚本共用的文件操作（train_multi_model.py / batch_dataset.py），只依赖标准库
+import os
+import shutil
+
+# ================================================================================
+#                                   文件操作
+# ================================================================================
+def copy_file_range_or_copy(src_path, dst_path):
+    """复制文件：Linux 上优先用 copy_file_range 由内核完成复制（XFS/Btrfs 等支持时为写时复制的reflink，
+    不实际复制数据），不支持时回退到 shutil.copy2"""
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            shutil.copystat(src_path, dst_path)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src_path, dst_path)
+
+def link_or_copy(src_path, dst_path):
+    """优先用硬链接放置图片（不复制数据），跨文件系统或不支持时回退到复制
+    目标已存在时：与原图是同一文件（硬链接），或大小和修改时间都相同（复制保留修改时间）则跳过，
+    否则说明原图已被替换，删除旧目标重新放置"""
+    try:
+        os.link(src_path, dst_path)
+    except FileExistsError:
+        src_stat = os.stat(src_path)
+        dst_stat = os.stat(dst_path)
+        if os.path.samestat(src_stat, dst_stat) or (
+                src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns == dst_stat.st_mtime_ns):
+            return
+        os.remove(dst_path)
+        link_or_copy(src_path, dst_path)
+    except OSError:
+        copy_file_range_or_copy(src_path, dst_path)
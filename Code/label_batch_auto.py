@@ -2,8 +2,21 @@
 from ultralytics import YOLO
 import os
 import time
+import cv2
+import multiprocessing
+import numpy as np
+import torch
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+# 可选依赖：numba 可用时用JIT内核格式化密集标签，否则回退到 np.savetxt
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # ================================================================================
 #                                   路径配置
 # ================================================================================
@@ -29,11 +42,170 @@ CELL_TYPES = [
 
 # 标注参数
 CONFIDENCE_THRESHOLD = 0.5  # 置信度阈值
-BATCH_SIZE = 10  # 进度显示间隔
+IMG_SIZE = 640  # 推理尺寸
+BATCH_SIZE = 10  # 进度显示间隔（按推理批输出，两次显示至少间隔该张数）
+BATCH_INFER = 16  # 每批推理图片数（可按显存调整为 8/32）
+USE_TENSORRT = True  # 是否导出并使用TensorRT FP16引擎（失败时依次回退到ONNX、.pt）
+LABEL_FORMAT = ["%d", "%.6f", "%.6f", "%.6f", "%.6f"]  # YOLO标签格式: 类别 x y w h
+SAVETXT_MIN_BOXES = 50  # 检测框数超过该值时用数组格式化（numba内核或 np.savetxt）写标签，否则用字符串拼接
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')  # 有效图片扩展名（元组，供 str.endswith 直接匹配）
+
+# 并行参数
+NUM_WORKERS = min(len(CELL_TYPES), os.cpu_count() or 1)  # 同时标注的细胞类型数（1为串行）
+GPU_CONCURRENCY = 1  # 每块GPU同时推理的进程数
+LABEL_WRITERS = 4  # 每个进程写标签文件的线程数（与GPU推理重叠）
+DECODE_WORKERS = min(8, os.cpu_count() or 1)  # 每个进程预读解码图片的线程数
+
+# 同一进程内输入尺寸固定，让cuDNN为PyTorch模型挑选最快的卷积算法
+torch.backends.cudnn.benchmark = True
+
+# 子进程使用的GPU编号及该GPU共享的信号量（由 _init_worker 设置，串行时为默认设备）
+_gpu_semaphore = None
+_device = None
 
 # ================================================================================
 #                                   标注函数
 # ================================================================================
+def _init_worker(gpu_semaphores, worker_counter):
+    """子进程初始化：按启动顺序轮流分配GPU，保存该GPU共享的信号量"""
+    global _gpu_semaphore, _device
+    with worker_counter.get_lock():
+        worker_idx = worker_counter.value
+        worker_counter.value += 1
+    
+    gpu_idx = worker_idx % len(gpu_semaphores)
+    _gpu_semaphore = gpu_semaphores[gpu_idx]
+    
+    if torch.cuda.is_available():
+        _device = gpu_idx
+        # 推理在GPU上，限制每个进程的PyTorch CPU线程数，避免多进程过度订阅
+        torch.set_num_threads(1)
+
+def _submit_decode(loader, image_paths):
+    """提交一批图片的 cv2.imread 解码任务，返回 future 列表"""
+    return [loader.submit(cv2.imread, path, cv2.IMREAD_COLOR) for path in image_paths]
+
+def _decode_result(future, image_path):
+    """取出解码结果，解码线程出错时按读取失败处理（返回 None）"""
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"解码图片 {os.path.basename(image_path)} 出错: {str(e)}")
+        return None
+
+def _predict_batch(model, valid, half):
+    """批量推理；整批出错时逐张重试，返回与 valid 等长的结果列表（推理失败的图片为 None）
+    每次 predict 调用期间占用本GPU的信号量，调用结束立即释放"""
+    predict_args = dict(conf=CONFIDENCE_THRESHOLD, imgsz=IMG_SIZE, batch=BATCH_INFER, half=half,
+                        device=_device, verbose=False)
+    try:
+        with _gpu_semaphore or nullcontext():
+            return model.predict(source=[image for _, image in valid], **predict_args)
+    except Exception as e:
+        print(f"批量推理出错，逐张重试: {str(e)}")
+    
+    results = []
+    for label_path, image in valid:
+        try:
+            with _gpu_semaphore or nullcontext():
+                results.append(model.predict(source=[image], **predict_args)[0])
+        except Exception as e:
+            print(f"推理 {os.path.basename(label_path)} 出错: {str(e)}")
+            results.append(None)
+    return results
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _put_uint(buf, pos, value):
+        """把非负整数的十进制字符写入 buf，返回新位置"""
+        if value == 0:
+            buf[pos] = 48
+            return pos + 1
+        start = pos
+        while value > 0:
+            buf[pos] = 48 + value % 10
+            value //= 10
+            pos += 1
+        buf[start:pos] = buf[start:pos][::-1].copy()
+        return pos
+    
+    @njit(cache=True)
+    def _format_label_bytes(labels):
+        """把 [cls, x, y, w, h] 数组格式化为 YOLO 标签文本（%d %.6f ...），返回 uint8 字节数组
+        归一化坐标均为非负数，小数部分用整数运算按6位四舍五入"""
+        n = labels.shape[0]
+        buf = np.empty(n * 64, np.uint8)
+        pos = 0
+        for i in range(n):
+            pos = _put_uint(buf, pos, np.int64(labels[i, 0]))
+            for j in range(1, 5):
+                buf[pos] = 32  # 空格
+                pos += 1
+                scaled = np.int64(labels[i, j] * 1000000.0 + 0.5)
+                pos = _put_uint(buf, pos, scaled // 1000000)
+                buf[pos] = 46  # 小数点
+                pos += 1
+                frac = scaled % 1000000
+                for k in range(5, -1, -1):
+                    buf[pos + k] = 48 + frac % 10
+                    frac //= 10
+                pos += 6
+            buf[pos] = 10  # 换行
+            pos += 1
+        return buf[:pos]
+
+def _write_label(label_path, labels):
+    """写入单张图片的标签文件（在写标签线程中执行），labels 为 None 时写入空文件"""
+    try:
+        if labels is not None and len(labels) > SAVETXT_MIN_BOXES:
+            # 密集检测：有 numba 时用JIT内核直接生成字节，否则交给 np.savetxt 按数组整体格式化
+            if NUMBA_AVAILABLE:
+                with open(label_path, 'wb') as f:
+                    f.write(_format_label_bytes(labels.astype(np.float64)).tobytes())
+            else:
+                np.savetxt(label_path, labels, fmt=LABEL_FORMAT)
+        else:
+            # 稀疏或无检测：直接拼接字符串，编码后单次写入（省去 savetxt 的固定开销）
+            lines = [] if labels is None else [f"{int(c)} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n"
+                                                for c, x, y, w, h in labels]
+            with open(label_path, 'wb') as f:
+                f.write("".join(lines).encode('ascii'))
+    except Exception as e:
+        print(f"写入标签 {os.path.basename(label_path)} 出错: {str(e)}")
+
+def load_annotation_model(model_path):
+    """加载标注模型，优先使用缓存的TensorRT FP16引擎，其次ONNX Runtime，最后回退到.pt（导出结果缓存复用）
+    导出在本进程分配的GPU上进行，并占用该GPU的信号量，首次运行时多个进程不会同时在同一GPU上构建引擎"""
+    if not USE_TENSORRT:
+        return YOLO(str(model_path))
+    
+    engine_path = model_path.with_suffix(".engine")
+    if not engine_path.exists():
+        try:
+            print(f"导出TensorRT引擎: {engine_path}")
+            with _gpu_semaphore or nullcontext():
+                YOLO(str(model_path)).export(format="engine", half=True, imgsz=IMG_SIZE, batch=BATCH_INFER,
+                                             dynamic=True, device=_device, verbose=False)
+        except Exception as e:
+            print(f"导出TensorRT引擎失败，尝试ONNX: {str(e)}")
+    
+    if engine_path.exists():
+        return YOLO(str(engine_path), task="detect")
+    
+    # 无TensorRT环境时使用ONNX Runtime（有CUDA时自动使用CUDAExecutionProvider）
+    onnx_path = model_path.with_suffix(".onnx")
+    if not onnx_path.exists():
+        try:
+            print(f"导出ONNX模型: {onnx_path}")
+            with _gpu_semaphore or nullcontext():
+                YOLO(str(model_path)).export(format="onnx", imgsz=IMG_SIZE, dynamic=True, device=_device,
+                                             verbose=False)
+        except Exception as e:
+            print(f"导出ONNX模型失败，使用PyTorch模型: {str(e)}")
+            return YOLO(str(model_path))
+    
+    return YOLO(str(onnx_path), task="detect")
+
 def auto_annotate_cell_type(cell_type):
     """自动标注指定细胞类型的数据集"""
     cell_name = cell_type["name"]
@@ -62,16 +234,24 @@ def auto_annotate_cell_type(cell_type):
     
     # 加载模型
     try:
-        model = YOLO(str(model_path))
+        model = load_annotation_model(model_path)
         print(f"成功加载模型")
     except Exception as e:
         print(f"加载模型失败: {str(e)}")
         return {"success": False, "cell_type": cell_name, "message": f"加载模型失败: {str(e)}"}
     
-    # 获取所有图片文件
-    image_files = list(source_dir.glob("*.*"))
-    valid_extensions = {'.jpg', '.jpeg', '.png', '.bmp'}
-    image_files = [f for f in image_files if f.suffix.lower() in valid_extensions]
+    # PyTorch 模型（未使用TensorRT/ONNX时）在CUDA上以FP16推理；导出的引擎自带精度，不再转换
+    half = isinstance(model.model, torch.nn.Module) and torch.cuda.is_available()
+    
+    # 获取所有图片文件，同时预先生成对应的标签路径字符串（热循环中不再构造 Path 对象）
+    labels_dir_str = str(labels_dir)
+    image_files = []
+    label_paths = []
+    with os.scandir(source_dir) as entries:
+        for e in entries:
+            if e.name.lower().endswith(IMAGE_EXTENSIONS) and e.is_file():
+                image_files.append(e.path)
+                label_paths.append(f"{labels_dir_str}{os.sep}{os.path.splitext(e.name)[0]}.txt")
     
     if not image_files:
         print(f"警告: 未找到图片文件")
@@ -81,53 +261,99 @@ def auto_annotate_cell_type(cell_type):
     
     # 开始标注
     total_detections = 0
+    processed = 0
+    failed = 0
+    aborted = False
     start_time = time.time()
     
-    for i, image_path in enumerate(image_files):
-        filename = image_path.stem
-        label_path = labels_dir / f"{filename}.txt"
+    try:
+        # 分批推理：解码线程池用 cv2.imread 预读下一批图片，与当前批的GPU推理重叠，
+        # 内存中最多只保留两批解码后的图片
+        # 推理线程只提取数组，标签文件交给写标签线程池，GPU不等待磁盘IO
+        # 多进程时用信号量限制同时推理的进程数，只在每次 predict 调用期间占用，等待解码和写标签时不占用GPU
+        batch_starts = range(0, len(image_files), BATCH_INFER)
+        reported = 0
         
-        try:
-            # 进行预测
-            results = model(str(image_path), conf=CONFIDENCE_THRESHOLD, verbose=False)
-            
-            detections = 0
-            with open(label_path, 'w', encoding='utf-8') as f:
-                for r in results:
-                    boxes = r.boxes
-                    if boxes is not None:
-                        for box in boxes:
-                            cls = int(box.cls[0])
-                            xywhn = box.xywhn[0].tolist()
-                            f.write(f"{cls} {xywhn[0]:.6f} {xywhn[1]:.6f} {xywhn[2]:.6f} {xywhn[3]:.6f}\n")
-                            detections += 1
+        with ThreadPoolExecutor(max_workers=DECODE_WORKERS) as loader, \
+             ThreadPoolExecutor(max_workers=LABEL_WRITERS) as writer:
+            pending = _submit_decode(loader, image_files[:BATCH_INFER])
             
-            total_detections += detections
+            # 预热：按推理批大小跑一次空白图片，让CUDA上下文、cuDNN/TensorRT算法选择和显存分配在计时前完成
+            warmup_images = [np.zeros((IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)] * BATCH_INFER
+            with _gpu_semaphore or nullcontext():
+                model.predict(source=warmup_images, imgsz=IMG_SIZE, batch=BATCH_INFER, half=half,
+                              device=_device, verbose=False)
+            start_time = time.time()
             
-            # 显示进度
-            if (i + 1) % BATCH_SIZE == 0 or (i + 1) == len(image_files):
-                elapsed = time.time() - start_time
-                rate = (i + 1) / elapsed if elapsed > 0 else 0
-                print(f"进度: {i+1}/{len(image_files)} 张, 检测: {total_detections} 个, 速率: {rate:.2f} 张/秒")
-        
-        except Exception as e:
-            print(f"处理图片 {filename} 出错: {str(e)}")
+            for batch_idx, start in enumerate(batch_starts):
+                end = start + BATCH_INFER
+                images = [_decode_result(future, path) for future, path in zip(pending, image_files[start:end])]
+                if end < len(image_files):
+                    pending = _submit_decode(loader, image_files[end:end + BATCH_INFER])
+                
+                valid = []
+                for image_path, label_path, image in zip(image_files[start:end], label_paths[start:end], images):
+                    if image is None:
+                        print(f"读取图片 {os.path.basename(image_path)} 失败")
+                        failed += 1
+                    else:
+                        valid.append((label_path, image))
+                
+                results = _predict_batch(model, valid, half) if valid else []
+                
+                for (label_path, _), r in zip(valid, results):
+                    if r is None:
+                        failed += 1
+                        continue
+                    try:
+                        labels = None
+                        boxes = r.boxes
+                        if boxes is not None and len(boxes) > 0:
+                            # 整张图片的标签拼成 [cls, x, y, w, h] 数组，一次性写入
+                            classes = boxes.cls.cpu().numpy().astype(np.int32)[:, None]
+                            xywhn = boxes.xywhn.cpu().numpy()
+                            labels = np.hstack([classes, xywhn])
+                            total_detections += labels.shape[0]
+                        
+                        writer.submit(_write_label, label_path, labels)
+                        processed += 1
+                    
+                    except Exception as e:
+                        print(f"处理标签 {os.path.basename(label_path)} 出错: {str(e)}")
+                        failed += 1
+                
+                # 显示进度（按批判断，距上次显示满 BATCH_SIZE 张或最后一批时输出）
+                if processed - reported >= BATCH_SIZE or batch_idx == len(batch_starts) - 1:
+                    reported = processed
+                    elapsed = time.time() - start_time
+                    rate = processed / elapsed if elapsed > 0 else 0
+                    print(f"进度: {processed}/{len(image_files)} 张, 检测: {total_detections} 个, 速率: {rate:.2f} 张/秒")
+    
+    except Exception as e:
+        # 批次级错误已在循环内处理，到这里说明标注被中断，剩余图片未处理
+        print(f"标注过程出错，已中断: {str(e)}")
+        aborted = True
     
     # 完成统计
     elapsed = time.time() - start_time
-    print(f"完成标注 {cell_chinese}")
-    print(f"处理图片: {len(image_files)} 张")
+    unprocessed = len(image_files) - processed - failed
+    print(f"完成标注 {cell_chinese}" if not aborted else f"标注中断 {cell_chinese}")
+    print(f"处理图片: {processed}/{len(image_files)} 张, 失败: {failed} 张, 未处理: {unprocessed} 张")
     print(f"检测目标: {total_detections} 个")
     print(f"总耗时: {elapsed:.2f} 秒")
-    print(f"平均速率: {len(image_files)/elapsed:.2f} 张/秒")
+    print(f"平均速率: {processed/elapsed if elapsed > 0 else 0:.2f} 张/秒")
     
-    return {
-        "success": True,
+    result = {
+        "success": not aborted,
         "cell_type": cell_name,
-        "total_images": len(image_files),
+        "total_images": processed,
+        "failed_images": failed + unprocessed,
         "total_detections": total_detections,
         "elapsed_time": elapsed
     }
+    if aborted:
+        result["message"] = f"标注中断，已处理 {processed}/{len(image_files)} 张"
+    return result
 
 # ================================================================================
 #                                   主函数
@@ -153,11 +379,21 @@ def main():
     total_detections = 0
     start_time = time.time()
     
-    # 依次处理每种细胞类型
-    for cell_type in CELL_TYPES:
-        result = auto_annotate_cell_type(cell_type)
-        results_summary.append(result)
-        
+    # 处理每种细胞类型（NUM_WORKERS > 1 时多进程并行）
+    # 子进程用 spawn 启动，避免 fork 继承父进程的CUDA状态；多GPU时进程轮流分配到各GPU
+    if NUM_WORKERS > 1:
+        num_gpus = max(1, torch.cuda.device_count())
+        print(f"并行标注: {NUM_WORKERS} 个进程, GPU数: {num_gpus}, 每块GPU并发: {GPU_CONCURRENCY}")
+        ctx = multiprocessing.get_context("spawn")
+        gpu_semaphores = [ctx.Semaphore(GPU_CONCURRENCY) for _ in range(num_gpus)]
+        worker_counter = ctx.Value('i', 0)
+        with ProcessPoolExecutor(max_workers=NUM_WORKERS, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(gpu_semaphores, worker_counter)) as executor:
+            results_summary = list(executor.map(auto_annotate_cell_type, CELL_TYPES))
+    else:
+        results_summary = [auto_annotate_cell_type(cell_type) for cell_type in CELL_TYPES]
+    
+    for result in results_summary:
         if result["success"]:
             success_count += 1
             total_images += result.get("total_images", 0)
@@ -176,7 +412,8 @@ def main():
     print(f"\n详细结果:")
     for result in results_summary:
         if result["success"]:
-            print(f"  {result['cell_type']}: {result['total_images']} 张图片, {result['total_detections']} 个细胞")
+            failed_text = f", 失败 {result['failed_images']} 张" if result.get("failed_images") else ""
+            print(f"  {result['cell_type']}: {result['total_images']} 张图片, {result['total_detections']} 个细胞{failed_text}")
         else:
             print(f"  {result['cell_type']}: 失败 - {result['message']}")
     
@@ -1,11 +1,23 @@
 # 批量训练所有细胞类型的YOLO11n模型
-from ultralytics import YOLO
 import os
+
+# 需在导入 torch/ultralytics 之前设置：允许CUDA显存段扩展，减少多次训练之间的显存碎片
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+
+from ultralytics import YOLO
+import copy
+import gc
 import time
-import pandas as pd
+import torch
+from torch.utils.checkpoint import checkpoint
 import shutil
 import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from train_utils import (get_train_device, configure_cuda_backends, compile_supported,
+                         validate_every_n_epochs, read_csv_columns)
 
 # ================================================================================
 #                                   路径配置
@@ -17,19 +29,52 @@ DATASETS_SMALL = PROJECT_ROOT / "datasets/datasets_small"
 MODELS_SMALL = PROJECT_ROOT / "models/models_small"
 PRETRAINED_MODEL = str(SCRIPT_DIR / "yolo11n.pt")  # 使用本地已存在的模型文件
 
+# ================================================================================
+#                                   设备配置
+# ================================================================================
+# 输入尺寸固定：开启cuDNN自动调优和TF32（与其他训练脚本共用，见 train_utils.py）
+configure_cuda_backends()
+
+# 多GPU并行训练：每块GPU同时训练的模型数（yolo11n显存占用小，显存充足时可设为2）
+JOBS_PER_GPU = 1
+
+# 单卡训练时使用AutoBatch，按该显存占比自动确定批大小（多卡DDP不支持AutoBatch，使用配置中的固定batch）
+AUTO_BATCH_FRACTION = 0.8
+
+# 并行训练子进程使用的GPU编号（由 _init_train_worker 设置）
+_worker_device = None
+
+# 顺序训练时两个模型之间等待显存释放的最长时间（秒）
+GPU_IDLE_TIMEOUT = 5
+
+def wait_for_gpu_idle(timeout=GPU_IDLE_TIMEOUT):
+    """轮询本进程保留的显存，释放完毕后立即返回（最多等待 timeout 秒），替代固定时长的休息"""
+    if not torch.cuda.is_available():
+        return
+    
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        gc.collect()
+        torch.cuda.empty_cache()
+        if all(torch.cuda.memory_reserved(i) == 0 for i in range(torch.cuda.device_count())):
+            return
+        time.sleep(0.5)
+    print(f"等待显存释放超时（{timeout}秒），继续训练")
+
 # ================================================================================
 #                                   训练配置
 # ================================================================================
 TRAIN_CONFIG = {
     "epochs": 40,
     "imgsz": 416,
-    "batch": 8,
-    "device": 0,
-    "workers": 4,
+    "batch": 16,  # 多卡DDP时的全局批大小（单卡时改用AutoBatch，见 AUTO_BATCH_FRACTION）
+    "device": get_train_device(),  # 多GPU时为设备列表，batch 为全局批大小（按卡均分）
+    "workers": min(8, os.cpu_count() or 1),  # 数据加载进程数（Ultralytics 的 InfiniteDataLoader 跨轮复用）
+    "cache": "ram",  # 小数据集解码后常驻内存，每轮不再重复解码图片（内存不足时Ultralytics会自动关闭）
     "amp": True,
+    "deterministic": False,  # 关闭确定性算法限制，cuDNN才能选用最快的卷积算法
     "verbose": True,
     "patience": 7,
-    "freeze": 5,
     "save": True,
     "project": str(MODELS_SMALL),
     "exist_ok": True,
@@ -44,6 +89,19 @@ TRAIN_CONFIG = {
     "lrf": 0.01,
 }
 
+if compile_supported():
+    TRAIN_CONFIG["compile"] = True
+
+# 对骨干网络启用梯度检查点的层数（yolo11n 骨干为第0-10层）：反向传播时重算激活值，
+# 以约20%的额外计算换取更低的显存峰值，AutoBatch 可选用更大的批大小
+GRADIENT_CHECKPOINT_LAYERS = 11
+
+# 多卡DDP训练时Ultralytics在子进程中重建训练器，回调不会传入，无法启用梯度检查点，改为冻结前5层节省显存
+DDP_FREEZE_LAYERS = 5
+
+# 训练结果中用于评估的指标列
+MAP50_COLUMN = "metrics/mAP50(B)"
+
 # ================================================================================
 #                                   辅助函数
 # ================================================================================
@@ -53,13 +111,14 @@ def get_available_datasets():
         print(f"错误: 数据集文件夹不存在: {DATASETS_SMALL}")
         return []
     
+    # os.scandir 的目录项自带文件类型，无需对每个子目录再 stat 一次
     datasets = []
-    for folder in DATASETS_SMALL.iterdir():
-        if folder.is_dir():
-            dataset_name = folder.name
-            yaml_file = folder / f"{dataset_name}.yaml"
-            if yaml_file.exists():
-                datasets.append(dataset_name)
+    with os.scandir(DATASETS_SMALL) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                dataset_name = entry.name
+                if os.path.isfile(os.path.join(entry.path, f"{dataset_name}.yaml")):
+                    datasets.append(dataset_name)
     
     print(f"找到 {len(datasets)} 个有效数据集")
     return sorted(datasets)
@@ -116,8 +175,55 @@ def select_datasets(datasets):
 # ================================================================================
 #                                   训练函数
 # ================================================================================
-def train_cell_type(cell_type):
-    """训练指定细胞类型模型"""
+def _checkpointed_forward(module, forward):
+    """包装单层的 forward：训练且需要梯度时使用梯度检查点，验证/推理时直接前向
+    反向传播重算时BN仍处于训练模式，会再次更新 running_mean/running_var，重算前后保存并恢复BN统计量"""
+    bn_layers = [m for m in module.modules() if isinstance(m, torch.nn.modules.batchnorm._BatchNorm)]
+    
+    def recompute(*args):
+        saved = [(bn.running_mean.clone(), bn.running_var.clone(), bn.num_batches_tracked.clone())
+                 for bn in bn_layers]
+        output = forward(*args)
+        with torch.no_grad():
+            for bn, (mean, var, tracked) in zip(bn_layers, saved):
+                bn.running_mean.copy_(mean)
+                bn.running_var.copy_(var)
+                bn.num_batches_tracked.copy_(tracked)
+        return output
+    
+    def wrapped(*args):
+        if module.training and torch.is_grad_enabled():
+            calls = [0]
+            
+            def run(*inputs):
+                # 第一次调用为正常前向，之后为反向传播时的重算
+                calls[0] += 1
+                return forward(*inputs) if calls[0] == 1 or not bn_layers else recompute(*inputs)
+            
+            return checkpoint(run, *args, use_reentrant=False)
+        return forward(*args)
+    return wrapped
+
+def enable_gradient_checkpointing(trainer):
+    """预训练准备开始回调：训练器已建好模型、尚未估算AutoBatch，为骨干网络各层启用梯度检查点
+    逐层包装而非 checkpoint_sequential，保留 Ultralytics 按层索引取跳连特征的逻辑"""
+    for layer in trainer.model.model[:GRADIENT_CHECKPOINT_LAYERS]:
+        layer.forward = _checkpointed_forward(layer, layer.forward)
+
+def disable_ema_checkpointing(trainer):
+    """预训练准备结束回调：EMA模型由训练模型深拷贝而来，移除其中的包装，
+    保证EMA验证走自身权重且保存的 best.pt/last.pt 可正常序列化"""
+    if trainer.ema is not None:
+        for layer in trainer.ema.ema.model[:GRADIENT_CHECKPOINT_LAYERS]:
+            layer.__dict__.pop("forward", None)
+
+@lru_cache(maxsize=1)
+def load_pretrained_model():
+    """每个进程只反序列化一次预训练权重，各细胞类型训练时复制使用"""
+    return YOLO(PRETRAINED_MODEL)
+
+def train_cell_type(cell_type, device=None):
+    """训练指定细胞类型模型（device 为 None 时使用 TRAIN_CONFIG 中的设备）"""
     print(f"\n开始训练 {cell_type} 模型")
     
     # 构建路径
@@ -136,17 +242,38 @@ def train_cell_type(cell_type):
         if output_dir.exists():
             shutil.rmtree(output_dir)
         
-        # 加载模型
-        model = YOLO(PRETRAINED_MODEL)
+        # 加载模型（复制进程内缓存的预训练模型，训练会替换 model.model，不影响缓存）
+        model = copy.deepcopy(load_pretrained_model())
         
         # 训练配置
         train_params = TRAIN_CONFIG.copy()
         train_params["data"] = str(data_yaml)
         train_params["name"] = f"{cell_type}_train"
+        if device is not None:
+            train_params["device"] = device
+        
+        # 多卡DDP时回调不生效（无梯度检查点），恢复冻结骨干前几层
+        if isinstance(train_params["device"], list):
+            train_params["freeze"] = DDP_FREEZE_LAYERS
+        
+        # 单卡时改用AutoBatch；并行训练时同一GPU上的多个进程平分显存占比
+        if torch.cuda.is_available() and not isinstance(train_params["device"], list):
+            jobs_on_gpu = JOBS_PER_GPU if device is not None else 1
+            train_params["batch"] = AUTO_BATCH_FRACTION / jobs_on_gpu
+            torch.cuda.empty_cache()
         
         # 开始训练
+        model.add_callback("on_pretrain_routine_start", enable_gradient_checkpointing)
+        model.add_callback("on_pretrain_routine_end", disable_ema_checkpointing)
+        model.add_callback("on_train_epoch_end", validate_every_n_epochs)
         model.train(**train_params)
         
+        # 释放模型和训练器占用的显存，避免下一个细胞类型训练时碎片累积
+        del model
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        
         print(f"训练完成")
         return True, get_best_map50(cell_type)
         
@@ -154,18 +281,25 @@ def train_cell_type(cell_type):
         print(f"训练出错: {str(e)}")
         return False, 0.0
 
+@lru_cache(maxsize=64)
+def _read_map50_cached(results_csv, mtime_ns):
+    """按 (路径, 修改时间) 缓存解析结果，文件更新后自动重新读取"""
+    df = read_csv_columns(results_csv, [MAP50_COLUMN])
+    return df[MAP50_COLUMN] if MAP50_COLUMN in df.columns else None
+
+def read_map50_column(results_csv):
+    """只解析 results.csv 中的 mAP50 列（列不存在时返回 None），同一文件重复调用直接命中缓存"""
+    results_csv = str(results_csv)
+    return _read_map50_cached(results_csv, os.stat(results_csv).st_mtime_ns)
+
 def get_best_map50(cell_type):
     """获取模型的最佳mAP50值"""
     results_csv = MODELS_SMALL / f"{cell_type}_train" / "results.csv"
     
-    if not results_csv.exists():
-        return 0.0
-    
+    # 文件不存在时 read_csv 直接抛出异常，无需事先 exists() 再多一次 stat
     try:
-        df = pd.read_csv(results_csv)
-        if 'metrics/mAP50(B)' in df.columns:
-            return df['metrics/mAP50(B)'].max()
-        return 0.0
+        map50 = read_map50_column(results_csv)
+        return map50.max() if map50 is not None else 0.0
     except:
         return 0.0
 
@@ -179,10 +313,10 @@ def evaluate_model(cell_type):
         return False, 0.0
     
     try:
-        df = pd.read_csv(results_csv)
+        map50 = read_map50_column(results_csv)
         
-        best_map50 = df['metrics/mAP50(B)'].max() if 'metrics/mAP50(B)' in df.columns else 0.0
-        final_map50 = df['metrics/mAP50(B)'].iloc[-1] if 'metrics/mAP50(B)' in df.columns else 0.0
+        best_map50 = map50.max() if map50 is not None else 0.0
+        final_map50 = map50.iloc[-1] if map50 is not None else 0.0
         
         print(f"\n评估结果:")
         print(f"  最佳mAP50: {best_map50:.4f}")
@@ -194,6 +328,22 @@ def evaluate_model(cell_type):
         print(f"评估出错: {str(e)}")
         return False, 0.0
 
+# ================================================================================
+#                                   并行训练
+# ================================================================================
+def _init_train_worker(worker_counter, gpu_count):
+    """子进程初始化：按启动顺序轮流分配GPU"""
+    global _worker_device
+    with worker_counter.get_lock():
+        worker_idx = worker_counter.value
+        worker_counter.value += 1
+    _worker_device = worker_idx % gpu_count
+
+def train_and_evaluate(cell_type):
+    """训练并评估单个细胞类型（并行训练时在子进程中执行，使用分配到的单块GPU）"""
+    train_cell_type(cell_type, _worker_device)
+    return evaluate_model(cell_type)
+
 # ================================================================================
 #                                   主函数
 # ================================================================================
@@ -223,17 +373,28 @@ def main():
     # 开始训练
     start_time = time.time()
     
-    for i, cell_type in enumerate(selected_datasets, 1):
-        print(f"\n[{i}/{len(selected_datasets)}] 训练 {cell_type}")
-        train_cell_type(cell_type)
-        
-        # 评估
-        evaluate_model(cell_type)
-        
-        # 如果不是最后一个，休息一下
-        if i < len(selected_datasets):
-            print(f"\n休息5秒...")
-            time.sleep(5)
+    # 多个训练进程可用时（多GPU或 JOBS_PER_GPU > 1），各模型在分配到的单块GPU上同时训练；
+    # 否则逐个训练（多卡时每个模型使用DDP）
+    gpu_count = torch.cuda.device_count()
+    num_jobs = min(gpu_count * JOBS_PER_GPU, len(selected_datasets))
+    if num_jobs > 1:
+        print(f"\n并行训练: {num_jobs} 个进程, {gpu_count} 块GPU")
+        ctx = multiprocessing.get_context("spawn")
+        worker_counter = ctx.Value('i', 0)
+        with ProcessPoolExecutor(max_workers=num_jobs, mp_context=ctx, initializer=_init_train_worker,
+                                 initargs=(worker_counter, gpu_count)) as executor:
+            list(executor.map(train_and_evaluate, selected_datasets))
+    else:
+        for i, cell_type in enumerate(selected_datasets, 1):
+            print(f"\n[{i}/{len(selected_datasets)}] 训练 {cell_type}")
+            train_cell_type(cell_type)
+            
+            # 评估
+            evaluate_model(cell_type)
+            
+            # 如果不是最后一个，等待显存释放后再开始下一个（通常无需等待）
+            if i < len(selected_datasets):
+                wait_for_gpu_idle()
     
     # 总结
     elapsed = time.time() - start_time
@@ -1,12 +1,24 @@
 # 训练13种类别细胞检测的YOLO11m模型
-from ultralytics import YOLO        # 导入YOLO模型类
 import os                           # 文件路径操作
+
+# 需在导入 torch/ultralytics 之前设置：允许CUDA显存段扩展，减少显存碎片
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+
+from ultralytics import YOLO        # 导入YOLO模型类
 import time                         # 计时和日志
-import pandas as pd                 # 数据分析
-import yaml                         # 配置文件生成
+import torch                        # GPU检测
+import json                         # 配置文件中路径的转义
 import shutil                       # 文件操作
-import random                       # 数据划分
+import psutil                       # 内存检测
+import zlib                         # 数据划分（文件名哈希）
+import cv2                          # 图片预缩放
+from PIL import Image               # 读取图片尺寸
 from pathlib import Path            # 路径操作
+from itertools import repeat, compress  # 并行参数、按掩码划分
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor  # 并行读取/放置数据
+from train_utils import (get_train_device, configure_cuda_backends, compile_supported,  # 训练脚本共用的辅助函数
+                         validate_every_n_epochs, read_csv_columns)
+from file_utils import link_or_copy  # 硬链接/复制图片
 
 # ================================================================================
 #                                   路径配置
@@ -51,6 +63,35 @@ DIR_TO_CLASSES = {
 CLASS_TO_INDEX = {cls: idx for idx, cls in enumerate(ALL_CLASSES)}
 INDEX_TO_CLASS = {idx: cls for idx, cls in enumerate(ALL_CLASSES)}
 
+# 查找表：原始目录名 -> (原始类别索引 -> 全局索引)，导入时一次性构建，读标签时直接按索引取值
+# 不在 ALL_CLASSES 中的类别对应 None
+DIR_TO_GLOBAL_INDEX = {
+    dir_name: tuple(CLASS_TO_INDEX.get(cls) for cls in classes)
+    for dir_name, classes in DIR_TO_CLASSES.items()
+}
+
+# 数据集中的图片扩展名（小写）
+IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".bmp"})
+# 验证集比例（百分比，按文件名哈希划分）
+VAL_PERCENT = 10
+# 数据准备时并行读取/复制标签文件、放置图片和标签的线程数（IO密集）
+LABEL_SCAN_WORKERS = 16
+# 预缩放图片保存的JPEG质量
+RESIZE_JPEG_QUALITY = 92
+# 预缩放图片的进程数（解码和缩放为CPU密集）
+PREP_WORKERS = os.cpu_count() or 1
+
+# ================================================================================
+#                                   设备配置
+# ================================================================================
+configure_cuda_backends()  # cuDNN自动调优 + TF32
+
+# 评估时从 results.csv 读取的指标列
+METRIC_COLUMNS = ["metrics/mAP50(B)", "metrics/mAP50-95(B)", "metrics/precision(B)", "metrics/recall(B)"]
+
+# 单卡训练时AutoBatch的目标显存占比
+AUTO_BATCH_FRACTION = 0.8
+
 # ================================================================================
 #                                   训练配置
 # ================================================================================
@@ -58,10 +99,11 @@ TRAIN_CONFIG = {
     # 基础配置
     "epochs": 60,
     "imgsz": 640,
-    "batch": 16,
-    "device": 0,
+    "batch": 16,  # 多卡DDP时的全局批大小（单卡时改用AutoBatch）
+    "device": get_train_device(),  # 多GPU时为设备列表，batch 为全局批大小（按卡均分）
     "workers": 8,
     "amp": True,
+    "deterministic": False,  # 关闭确定性算法限制，cuDNN才能选用最快的卷积算法
     "verbose": True,
     "patience": 15,
     "save_best": True,
@@ -92,45 +134,60 @@ TRAIN_CONFIG = {
     "close_mosaic": 5,
 }
 
+if compile_supported():
+    TRAIN_CONFIG["compile"] = True
+
 # ================================================================================
 #                                   辅助函数
 # ================================================================================
-def get_class_index_from_label_file(label_path, cell_type):
-    """从标签文件读取原始类别索引，转换为全局索引"""
-    if not label_path.exists():
+def get_class_index_from_label_file(label_path, global_indices):
+    """从标签文件读取原始类别索引，按所在目录的查找表 global_indices 转换为全局索引"""
+    # 直接打开，不存在时捕获异常，省去一次 exists() 的 stat；二进制读取省去文本解码
+    try:
+        with open(label_path, 'rb') as f:
+            first_line = f.readline()
+    except FileNotFoundError:
         return None
     
-    with open(label_path, 'r') as f:
-        first_line = f.readline().strip()
-        if not first_line:
-            return None
-        
-        parts = first_line.split()
-        if len(parts) < 5:
-            return None
-        
-        orig_idx = int(parts[0])
-        target_classes = DIR_TO_CLASSES.get(cell_type, [])
-        
-        # 如果目录下只有一个类别，直接返回全局索引
-        if len(target_classes) == 1:
-            return CLASS_TO_INDEX.get(target_classes[0])
-        
-        # 如果目录下有多个类别，根据原始索引选择
-        if 0 <= orig_idx < len(target_classes):
-            target_class = target_classes[orig_idx]
-            return CLASS_TO_INDEX.get(target_class)
-        
+    # 只需第一个字段，最多切分出5段用于检查列数，其余部分不再切分
+    parts = first_line.split(None, 4)
+    if len(parts) < 5:
+        return None
+    
+    orig_idx = int(parts[0])
+    
+    # 如果目录下只有一个类别，直接返回全局索引
+    if len(global_indices) == 1:
+        return global_indices[0]
+    
+    # 如果目录下有多个类别，根据原始索引查表
+    if 0 <= orig_idx < len(global_indices):
+        return global_indices[orig_idx]
+    
     return None
 
 def process_label_file(src_label_path, dst_label_path, global_class_idx):
-    """处理标签文件，更新类别索引"""
-    with open(src_label_path, 'r') as src, open(dst_label_path, 'w') as dst:
-        for line in src:
-            parts = line.strip().split()
-            if len(parts) >= 5:
-                # 替换为全局类别索引
-                dst.write(f"{global_class_idx} {' '.join(parts[1:])}\n")
+    """处理标签文件，更新类别索引（整体读入、逐行替换类别列后一次性写出；标签为纯ASCII，按字节处理省去编解码）
+    读取用无缓冲的原始文件对象（read() 读到文件末尾），写入保留默认缓冲写入器，保证全部字节写出"""
+    class_token = b"%d" % global_class_idx
+    with open(src_label_path, 'rb', buffering=0) as src:
+        lines = src.read().splitlines()
+    
+    # 替换为全局类别索引，丢弃列数不足的行
+    out = [b" ".join([class_token] + parts[1:]) for parts in map(bytes.split, lines) if len(parts) >= 5]
+    with open(dst_label_path, 'wb') as dst:
+        dst.write(b"\n".join(out) + b"\n" if out else b"")
+
+def place_sample(task):
+    """把单张图片及其标签放入划分目录（在线程池中执行）"""
+    src_images, img_name, label_path, global_idx, split_dir, cell_type = task
+    
+    # 链接图片
+    link_or_copy(os.path.join(src_images, img_name), os.path.join(split_dir, "images", f"{cell_type}_{img_name}"))
+    
+    # 处理标签（扫描阶段已确认标签存在）
+    img_stem = img_name[:img_name.rfind('.')]
+    process_label_file(label_path, os.path.join(split_dir, "labels", f"{cell_type}_{img_stem}.txt"), global_idx)
 
 # ================================================================================
 #                                   数据集准备函数
@@ -148,10 +205,8 @@ def prepare_balanced_dataset():
     (combined_dir / "val" / "images").mkdir(parents=True, exist_ok=True)
     (combined_dir / "val" / "labels").mkdir(parents=True, exist_ok=True)
     
-    # 设置随机种子确保可复现
-    random.seed(42)
-    
     total_stats = {"train": 0, "val": 0, "by_class": {}}
+    tasks = []
     
     # 处理每个原始目录
     for cell_type, target_classes in DIR_TO_CLASSES.items():
@@ -165,77 +220,67 @@ def prepare_balanced_dataset():
         print(f"\n处理类别: {cell_type}")
         print(f"对应子类: {target_classes}")
         
-        # 收集所有有效图片
-        valid_images = []
-        for img_path in src_images.glob("*.*"):
-            if img_path.suffix.lower() not in ['.jpg', '.jpeg', '.png', '.bmp']:
-                continue
-            
-            img_name = img_path.stem
-            label_path = src_labels / f"{img_name}.txt"
-            
-            # 确定图片的全局类别索引
-            global_idx = get_class_index_from_label_file(label_path, cell_type)
-            if global_idx is not None:
-                valid_images.append((img_path, label_path, global_idx))
+        # 收集所有有效图片（只保留文件名字符串，不为每张图片创建 Path 对象）
+        image_names = []
+        label_paths = []
+        with os.scandir(src_images) as entries:
+            for entry in entries:
+                name = entry.name
+                dot = name.rfind('.')
+                if dot > 0 and name[dot:].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                    image_names.append(name)
+                    label_paths.append(os.path.join(src_labels, f"{name[:dot]}.txt"))
+        
+        # 确定图片的全局类别索引（读取标签文件为IO密集操作，用线程池并行；查找表每个目录只取一次）
+        global_indices = DIR_TO_GLOBAL_INDEX[cell_type]
+        with ThreadPoolExecutor(max_workers=LABEL_SCAN_WORKERS) as executor:
+            class_indices = list(executor.map(get_class_index_from_label_file, label_paths, repeat(global_indices)))
+        
+        valid_images = [(img_name, label_path, global_idx)
+                        for img_name, label_path, global_idx in zip(image_names, label_paths, class_indices)
+                        if global_idx is not None]
         
         print(f"找到 {len(valid_images)} 张有效图片")
         
         # 按类别分组
         images_by_class = {}
-        for img_path, label_path, global_idx in valid_images:
+        for img_name, label_path, global_idx in valid_images:
             class_name = INDEX_TO_CLASS[global_idx]
             if class_name not in images_by_class:
                 images_by_class[class_name] = []
-            images_by_class[class_name].append((img_path, label_path, global_idx))
+            images_by_class[class_name].append((img_name, label_path, global_idx))
         
         # 按类别分别划分
         for class_name, image_list in images_by_class.items():
             if class_name not in total_stats["by_class"]:
                 total_stats["by_class"][class_name] = {"train": 0, "val": 0}
             
-            # 打乱当前类别的图片
-            random.shuffle(image_list)
-            
-            # 90%训练，10%验证
-            split_idx = int(len(image_list) * 0.9)
-            train_list = image_list[:split_idx]
-            val_list = image_list[split_idx:] if split_idx < len(image_list) else []
-            
-            # 处理训练集
-            for img_path, label_path, global_idx in train_list:
-                target_name = f"{cell_type}_{img_path.name}"
-                
-                # 复制图片
-                shutil.copy2(img_path, combined_dir / "train" / "images" / target_name)
-                
-                # 处理标签
-                if label_path.exists():
-                    label_name = f"{cell_type}_{img_path.stem}.txt"
-                    dst_label = combined_dir / "train" / "labels" / label_name
-                    process_label_file(label_path, dst_label, global_idx)
-                
-                total_stats["train"] += 1
-                total_stats["by_class"][class_name]["train"] += 1
+            # 按目标文件名的CRC32哈希划分（约90%训练，10%验证）：
+            # 与遍历顺序无关，每次运行同一图片总落在同一划分，重复运行可复用已有链接和数据集缓存
+            # 前缀 "{cell_type}_" 的CRC只算一次，逐个文件名在其基础上续算（结果与对完整名称计算相同）
+            prefix_crc = zlib.crc32(f"{cell_type}_".encode())
+            is_val = [zlib.crc32(item[0].encode(), prefix_crc) % 100 < VAL_PERCENT for item in image_list]
+            train_list = list(compress(image_list, [not v for v in is_val]))
+            val_list = list(compress(image_list, is_val))
             
-            # 处理验证集
-            for img_path, label_path, global_idx in val_list:
-                target_name = f"{cell_type}_{img_path.name}"
-                
-                # 复制图片
-                shutil.copy2(img_path, combined_dir / "val" / "images" / target_name)
+            # 记录放置任务（实际的链接和标签处理在线程池中并行执行）
+            for split, split_list in (("train", train_list), ("val", val_list)):
+                split_dir = str(combined_dir / split)
+                for img_name, label_path, global_idx in split_list:
+                    tasks.append((str(src_images), img_name, label_path, global_idx, split_dir, cell_type))
                 
-                # 处理标签
-                if label_path.exists():
-                    label_name = f"{cell_type}_{img_path.stem}.txt"
-                    dst_label = combined_dir / "val" / "labels" / label_name
-                    process_label_file(label_path, dst_label, global_idx)
-                
-                total_stats["val"] += 1
-                total_stats["by_class"][class_name]["val"] += 1
+                total_stats[split] += len(split_list)
+                total_stats["by_class"][class_name][split] += len(split_list)
             
             print(f"  {class_name}: {len(train_list)} 训练, {len(val_list)} 验证")
     
+    # 并行放置所有图片和标签（划分已在上面确定，结果与执行顺序无关）
+    if tasks:
+        print(f"\n放置 {len(tasks)} 个样本（{LABEL_SCAN_WORKERS} 个线程）...")
+        with ThreadPoolExecutor(max_workers=LABEL_SCAN_WORKERS) as executor:
+            for _ in executor.map(place_sample, tasks):
+                pass
+    
     # 打印统计信息
     print("\n" + "="*60)
     print("数据集统计:")
@@ -251,21 +296,102 @@ def prepare_balanced_dataset():
     
     return combined_dir if total_stats['train'] + total_stats['val'] > 0 else None
 
+def check_jpeg_backend():
+    """检查 OpenCV 的JPEG解码库：Ultralytics 数据加载用 cv2.imread 解码，
+    libjpeg-turbo（SIMD加速）比普通 libjpeg 快2-4倍，解码往往是数据加载的瓶颈"""
+    jpeg_lines = [line.strip() for line in cv2.getBuildInformation().splitlines()
+                  if line.strip().startswith("JPEG:")]
+    backend = jpeg_lines[0].split(":", 1)[1].strip() if jpeg_lines else "未知"
+    print(f"OpenCV JPEG解码库: {backend}")
+    if "turbo" not in backend.lower():
+        print("  提示: 未使用 libjpeg-turbo，建议安装官方 opencv-python 轮子（自带 libjpeg-turbo）以加速解码")
+
+def resize_sample(task):
+    """把单张图片按最长边等比缩放到 imgsz 写入目标目录（在进程池中执行）
+    原图不大于 imgsz 时直接链接；目标已存在且不比原图旧时跳过，重复运行只处理新增或更新的图片"""
+    src_path, dst_path, imgsz = task
+    # 链接/复制的目标与原图修改时间相同，缩放生成的目标更新；原图被替换后比目标新，删除旧目标重新生成
+    try:
+        if os.stat(dst_path).st_mtime >= os.stat(src_path).st_mtime:
+            return
+        os.remove(dst_path)
+    except FileNotFoundError:
+        pass
+    
+    # 只读取文件头判断是否需要缩放，不需要缩放的图片不做解码（EXIF旋转不改变最长边）
+    with Image.open(src_path) as img:
+        width, height = img.size
+    
+    scale = imgsz / max(width, height)
+    if scale >= 1:
+        link_or_copy(src_path, dst_path)
+        return
+    
+    image = cv2.imread(src_path)
+    if image is None:
+        print(f"  警告: 无法读取图片 {src_path}")
+        return
+    
+    # 尺寸以解码结果为准：PIL文件头尺寸不考虑EXIF方向，cv2.imread 会按EXIF旋转
+    height, width = image.shape[:2]
+    
+    # 等比缩放，归一化的标签坐标保持不变
+    resized = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                         interpolation=cv2.INTER_AREA)
+    cv2.imwrite(dst_path, resized, [cv2.IMWRITE_JPEG_QUALITY, RESIZE_JPEG_QUALITY])
+
+def prepare_resized_dataset(combined_dir, imgsz):
+    """一次性把合并数据集的图片预缩放到训练尺寸，避免每轮训练都解码和缩放原始大图"""
+    resized_dir = DATASETS_DIR / f"{combined_dir.name}_{imgsz}"
+    tasks = []
+    label_srcs = []
+    label_dsts = []
+    
+    for split in ("train", "val"):
+        (resized_dir / split / "images").mkdir(parents=True, exist_ok=True)
+        (resized_dir / split / "labels").mkdir(parents=True, exist_ok=True)
+        
+        with os.scandir(combined_dir / split / "images") as entries:
+            for entry in entries:
+                tasks.append((entry.path, str(resized_dir / split / "images" / entry.name), imgsz))
+        
+        # 标签为归一化坐标，与图片尺寸无关，直接复制（每次覆盖，保持与合并数据集一致）
+        with os.scandir(combined_dir / split / "labels") as entries:
+            for entry in entries:
+                if entry.name.endswith(".txt"):
+                    label_srcs.append(entry.path)
+                    label_dsts.append(resized_dir / split / "labels" / entry.name)
+    
+    # 复制标签文件（大量小文件，IO密集，用线程池并行）
+    with ThreadPoolExecutor(max_workers=LABEL_SCAN_WORKERS) as executor:
+        list(executor.map(shutil.copyfile, label_srcs, label_dsts))
+    
+    print(f"预缩放 {len(tasks)} 张图片到 {imgsz}（{PREP_WORKERS} 个进程）...")
+    with ProcessPoolExecutor(max_workers=PREP_WORKERS) as executor:
+        for _ in executor.map(resize_sample, tasks, chunksize=64):
+            pass
+    
+    print(f"预缩放数据集: {resized_dir}")
+    return resized_dir
+
 def generate_unified_data_yaml(combined_dir):
     """生成数据配置文件"""
     MODELS_DIR.mkdir(exist_ok=True)
     yaml_path = MODELS_DIR / "full_dataset_all_classes.yaml"
     
-    yaml_content = {
-        "path": str(combined_dir),
-        "train": "train/images",
-        "val": "val/images",
-        "nc": len(ALL_CLASSES),
-        "names": ALL_CLASSES
-    }
+    # 结构固定，直接写出YAML文本；路径用JSON字符串写出（JSON字符串即合法的YAML双引号字符串），
+    # 含空格、冒号或反斜杠的路径也能正确解析
+    lines = [
+        f"path: {json.dumps(str(combined_dir))}",
+        "train: train/images",
+        "val: val/images",
+        f"nc: {len(ALL_CLASSES)}",
+        "names:",
+    ]
+    lines.extend(f"- {name}" for name in ALL_CLASSES)
     
     with open(yaml_path, 'w', encoding='utf-8') as f:
-        yaml.dump(yaml_content, f, allow_unicode=True)
+        f.write("\n".join(lines) + "\n")
     
     print(f"生成YAML配置文件: {yaml_path}")
     return str(yaml_path)
@@ -273,7 +399,21 @@ def generate_unified_data_yaml(combined_dir):
 # ================================================================================
 #                                   训练和评估函数
 # ================================================================================
-def train_unified_model(yaml_path):
+def choose_cache_mode(dataset_dir, imgsz):
+    """按解码后图片的估算大小选择缓存方式：可用内存充足时缓存到内存，否则缓存到磁盘(.npy)"""
+    num_images = 0
+    for split in ("train", "val"):
+        with os.scandir(dataset_dir / split / "images") as entries:
+            num_images += sum(1 for _ in entries)
+    
+    # Ultralytics 缓存的是缩放到 imgsz 后的 uint8 图像，按最大尺寸估算
+    cache_bytes = num_images * imgsz * imgsz * 3
+    available = psutil.virtual_memory().available
+    mode = "ram" if cache_bytes < available * 0.5 else "disk"
+    print(f"图片缓存: {mode} (估算 {cache_bytes / 1e9:.1f} GB, 可用内存 {available / 1e9:.1f} GB)")
+    return mode
+
+def train_unified_model(yaml_path, dataset_dir):
     """训练模型"""
     output_dir = MODELS_DIR / "all_cells_train"
     
@@ -288,8 +428,15 @@ def train_unified_model(yaml_path):
     train_config["project"] = str(MODELS_DIR)
     train_config["name"] = "all_cells_train"
     train_config["save"] = True
+    train_config["cache"] = choose_cache_mode(dataset_dir, train_config["imgsz"])
+    
+    # 单卡时使用AutoBatch按显存占比确定批大小（多卡DDP不支持AutoBatch，保留固定batch）
+    if torch.cuda.is_available() and not isinstance(train_config["device"], list):
+        train_config["batch"] = AUTO_BATCH_FRACTION
+        torch.cuda.empty_cache()
     
     print(f"\n开始训练，输出目录: {output_dir}")
+    model.add_callback("on_train_epoch_end", validate_every_n_epochs)
     model.train(**train_config)
     
     print("模型训练完成")
@@ -304,7 +451,7 @@ def evaluate_model(output_dir):
         return None
     
     try:
-        df = pd.read_csv(results_csv)
+        df = read_csv_columns(results_csv, METRIC_COLUMNS)
         
         metrics = {
             "epochs": len(df),
@@ -342,6 +489,7 @@ def main():
     start_time = time.time()
     print("开始训练13种类别细胞检测模型")
     print(f"开始时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    check_jpeg_backend()
     
     # 检查数据集目录
     if not DATASETS_DIR.exists():
@@ -355,16 +503,20 @@ def main():
         print("数据集准备失败")
         return
     
-    # 2. 生成YAML配置文件
-    print("\n步骤2: 生成数据配置文件...")
-    yaml_path = generate_unified_data_yaml(combined_dir)
+    # 2. 预缩放图片到训练尺寸
+    print("\n步骤2: 预缩放图片...")
+    resized_dir = prepare_resized_dataset(combined_dir, TRAIN_CONFIG["imgsz"])
+    
+    # 3. 生成YAML配置文件
+    print("\n步骤3: 生成数据配置文件...")
+    yaml_path = generate_unified_data_yaml(resized_dir)
     
-    # 3. 训练模型
-    print("\n步骤3: 开始训练模型...")
-    output_dir = train_unified_model(yaml_path)
+    # 4. 训练模型
+    print("\n步骤4: 开始训练模型...")
+    output_dir = train_unified_model(yaml_path, resized_dir)
     
-    # 4. 评估模型
-    print("\n步骤4: 评估模型...")
+    # 5. 评估模型
+    print("\n步骤5: 评估模型...")
     evaluate_model(output_dir)
     
     # 总结
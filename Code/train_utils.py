@@ -0,0 +1,46 @@
+# 训练脚本共用的辅助函数（train_batch_model.py / train_multi_model.py）
+import importlib.util
+import pandas as pd
+import torch
+from ultralytics.cfg import DEFAULT_CFG_DICT
+
+# 每隔多少轮验证一次（其余轮次跳过验证以节省时间）
+VAL_PERIOD = 5
+
+# ================================================================================
+#                                   设备配置
+# ================================================================================
+def get_train_device():
+    """检测可用GPU：多卡时返回设备列表（Ultralytics 自动启用DDP多卡训练），单卡返回0，无GPU时使用CPU"""
+    gpu_count = torch.cuda.device_count()
+    if gpu_count > 1:
+        return list(range(gpu_count))
+    return 0 if gpu_count == 1 else "cpu"
+
+def configure_cuda_backends():
+    """输入尺寸固定：开启cuDNN自动调优，并允许Ampere及以上GPU用TF32执行FP32矩阵乘和卷积"""
+    torch.backends.cudnn.benchmark = True
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+
+def compile_supported():
+    """torch.compile（Inductor）融合算子、减少逐层调度开销：需 Ultralytics 支持 compile 参数且已安装 Triton"""
+    return "compile" in DEFAULT_CFG_DICT and importlib.util.find_spec("triton") is not None
+
+# ================================================================================
+#                                   训练与评估
+# ================================================================================
+def validate_every_n_epochs(trainer):
+    """训练轮结束回调：只在每 VAL_PERIOD 轮验证一次（最后一轮及可能早停时Ultralytics仍会验证）
+    跳过验证的轮次清空 fitness，避免沿用旧指标覆盖 best.pt 或重置早停计数"""
+    validate_now = (trainer.epoch + 1) % VAL_PERIOD == 0
+    trainer.args.val = validate_now
+    if not validate_now:
+        trainer.fitness = None
+
+def read_csv_columns(csv_path, columns):
+    """只解析CSV中的指定列：优先用 pyarrow 引擎（多线程），未安装或缺少某列时回退到默认引擎（缺少的列被忽略）"""
+    try:
+        return pd.read_csv(csv_path, engine="pyarrow", usecols=columns)
+    except (ImportError, ValueError):
+        return pd.read_csv(csv_path, usecols=lambda col: col in columns)
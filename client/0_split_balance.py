@@ -2,16 +2,53 @@
 处理数据集 (8个类别 × 1500张)
 训练集总计: 9600 张
 验证集总计: 2400 张
+
+原数据集只读，所有输出写入新数据集目录；原图默认复制到新数据集。
+开启 USE_HARDLINKS 后原图改为硬链接，新旧数据集共享同一文件，
+此时原地修改新数据集中的原图会同时改动原数据集
 """
 
 import os
+import glob
+import zlib
 import pathlib
 import shutil
 import cv2
 import random
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from sklearn.model_selection import train_test_split
 import albumentations as A
 
+# pyvips（libvips）解码/编码JPEG比OpenCV更快，可选依赖；未安装时回退到 OpenCV + albumentations
+os.environ.setdefault('VIPS_CONCURRENCY', '1')  # 并行由进程池负责，libvips内部单线程
+try:
+    import pyvips
+    PYVIPS_AVAILABLE = True
+except (ImportError, OSError):  # Windows下缺少libvips动态库时抛出OSError
+    PYVIPS_AVAILABLE = False
+
+# imagesize 只解析文件头获取宽高，用于廉价地校验复制结果，可选依赖
+try:
+    import imagesize
+    IMAGESIZE_AVAILABLE = True
+except ImportError:
+    IMAGESIZE_AVAILABLE = False
+
+# TurboJPEG（libjpeg-turbo）用SIMD解码/编码JPEG，可选依赖；OpenCV回退路径使用，其他格式仍走OpenCV
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+    _tj = TurboJPEG()
+except (ImportError, OSError, RuntimeError):  # 找不到 libturbojpeg 动态库时抛出 RuntimeError/OSError
+    _tj = None
+
+# speedcopy 让 shutil.copyfile/copy2 使用系统级复制（Windows CopyFile2、SMB服务端复制），可选依赖
+try:
+    import speedcopy
+    speedcopy.patch_copyfile()
+except ImportError:
+    pass
+
 # 路径配置
 src = pathlib.Path(r'D:\Code\YOLO_8Cell\datasets')  # 原数据集路径（只读）
 dst = pathlib.Path(r'D:\Code\YOLO_8Cell\datasets8')  # 新数据集路径（所有操作在这里进行）
@@ -21,79 +58,332 @@ TRAIN_COUNT = 1200  # 每个类别训练集图片数量
 VAL_COUNT = 300  # 每个类别验证集图片数量
 TOTAL_COUNT = TRAIN_COUNT + VAL_COUNT  # 每个类别总共1500张图片
 
+# 并行配置
+AUG_WORKERS = os.cpu_count() or 1  # 数据增强进程数（解码、增强、编码为CPU密集操作）
+COPY_WORKERS = 16  # 复制文件线程数（IO密集，复制时释放GIL）
+USE_HARDLINKS = False  # 原图用硬链接放置（不复制数据，需与原数据集同卷）；开启后新旧数据集共享文件，见文件头说明
+
 # 数据增强配置
 AUG = A.Compose([
     A.HorizontalFlip(p=0.5),  # 水平翻转，概率50%
     A.RandomRotate90(p=0.5),  # 随机旋转90度，概率50%
-    A.RandomBrightnessContrast(p=0.3)  # 随机亮度对比度调整，概率30%
 ])
+BRIGHTNESS_CONTRAST_P = 0.3  # 随机亮度对比度调整概率30%（uint8查找表实现，见 random_brightness_contrast）
+JPEG_QUALITY = 95  # 增强图片的JPEG保存质量（与cv2.imwrite默认值一致）
+JPEG_SUFFIXES = ('.jpg', '.jpeg')  # 按JPEG编解码的文件后缀
+
+# 解码缓存：保存原图解码后的BGR像素（.npy），重复运行时内存映射读取，跳过JPEG解码（仅OpenCV路径）
+# 磁盘占用：缓存为未压缩像素，约为JPEG文件的10~20倍（每张 宽×高×3 字节）；原图更新时旧缓存自动删除，
+# 删除原图后对应缓存不会自动清理，可直接删除 DECODE_CACHE_DIR 整个目录释放空间
+USE_DECODE_CACHE = True  # 是否启用解码缓存
+DECODE_CACHE_VERSION = 2  # 解码结果变化时递增（如按EXIF方向旋转），旧版本缓存自动失效
+DECODE_CACHE_DIR = dst / 'decode_cache'  # 解码缓存目录，按类别分子目录，清理输出目录时保留
+
 
+def _init_aug_worker():
+    """增强进程初始化：关闭OpenCV内部多线程，避免与多进程叠加导致CPU过度订阅"""
+    cv2.setNumThreads(0)
+
+
+def random_brightness_contrast():
+    """
+    随机抽取亮度对比度参数，与 A.RandomBrightnessContrast 默认参数一致：
+    out = img × alpha + beta × 255，alpha ∈ [0.8, 1.2]，beta ∈ [-0.2, 0.2]
+    """
+    alpha = 1.0 + random.uniform(-0.2, 0.2)
+    beta = random.uniform(-0.2, 0.2) * 255
+    return alpha, beta
+
+
+def exif_orientation(data):
+    """读取JPEG文件头中EXIF的方向标签（0x0112），没有或无法解析时返回1（正常方向）"""
+    pos = 2
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        if marker in (0xD9, 0xDA):  # 到达图像数据，后面不再有EXIF
+            break
+        length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+        if marker == 0xE1 and data[pos + 4:pos + 10] == b'Exif\0\0':
+            tiff = data[pos + 10:pos + 2 + length]
+            order = 'little' if tiff[:2] == b'II' else 'big'
+            ifd = int.from_bytes(tiff[4:8], order)
+            for i in range(int.from_bytes(tiff[ifd:ifd + 2], order)):
+                entry = tiff[ifd + 2 + 12 * i:ifd + 14 + 12 * i]
+                if len(entry) < 12:
+                    break
+                if int.from_bytes(entry[:2], order) == 0x0112:
+                    return int.from_bytes(entry[8:10], order)
+            return 1
+        pos += 2 + length
+    return 1
+
+
+def decode_image(data, suffix):
+    """
+    将图片文件内容解码为BGR数组，失败返回None；JPEG优先用TurboJPEG解码
+    TurboJPEG不处理EXIF方向，带旋转标签的JPEG交给OpenCV（按EXIF旋转，与 cv2.imread 一致）
+    """
+    if not data:
+        return None
 
-def augment_images(original_files, target_count, class_name):
+    if _tj is not None and suffix.lower() in JPEG_SUFFIXES and exif_orientation(data) == 1:
+        try:
+            return _tj.decode(data, pixel_format=TJPF_BGR)
+        except OSError:
+            pass  # 非标准JPEG交给OpenCV处理
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def write_image(path, img):
+    """保存BGR数组；JPEG优先用TurboJPEG编码（4:2:0采样，与cv2.imwrite一致）"""
+    if _tj is not None and path.suffix.lower() in JPEG_SUFFIXES:
+        data = _tj.encode(np.ascontiguousarray(img), quality=JPEG_QUALITY,
+                          pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)
+        with open(path, 'wb') as f:
+            f.write(data)
+    else:
+        cv2.imwrite(str(path), img)
+
+
+def decode_cache_path(original_file):
+    """解码缓存文件路径，文件名包含原图大小、修改时间和缓存版本，原图变化后自动失效"""
+    stat = original_file.stat()
+    cache_name = f"{original_file.name}.{stat.st_size}_{stat.st_mtime_ns}_v{DECODE_CACHE_VERSION}.npy"
+    return DECODE_CACHE_DIR / original_file.parent.name / cache_name
+
+
+def load_decode_cache(cache_path):
+    """以内存映射方式读取解码缓存，未命中或缓存损坏时返回None"""
+    if not cache_path.exists():
+        return None
+    try:
+        return np.asarray(np.load(cache_path, mmap_mode='r'))
+    except (OSError, ValueError):
+        return None
+
+
+def save_decode_cache(cache_path, img):
+    """写入解码缓存：先写临时文件再替换，避免中断后留下不完整的缓存；同时删除该原图过期的旧缓存"""
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, img)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"  警告: 写入解码缓存失败 {cache_path}: {e}")
+        return
+
+    # 缓存文件名为 <原图文件名>.<大小>_<修改时间>_v<版本>.npy，同一原图的其他缓存均已过期
+    source_name = cache_path.name.rsplit('.', 2)[0]
+    for old_path in cache_path.parent.glob(f"{glob.escape(source_name)}.*.npy"):
+        if old_path != cache_path and old_path.name.rsplit('.', 2)[0] == source_name:
+            try:
+                old_path.unlink()
+            except OSError:
+                pass
+
+
+def _augment_one(task):
     """
-    对原始图片进行数据增强，生成目标数量的图片
+    放置单张原图并生成其增强图片，直接写入最终的 train/val 位置（在进程池中执行）
+    随机种子由类别目录和文件名决定（不同类别的同名图片增强不同），结果与进程调度顺序无关
+    返回 (原图是否放置成功, 成功生成的增强图片数量)
     """
-    if len(original_files) >= target_count:
-        return original_files[:target_count]
+    original_file, original_target, aug_targets = task
+    seed = zlib.crc32(f"{original_file.parent.name}/{original_file.name}".encode())
+    random.seed(seed)
 
-    print(f"  需要增强: {len(original_files)} -> {target_count} 张")
+    cache_path = None
+    if USE_DECODE_CACHE and not PYVIPS_AVAILABLE:
+        try:
+            cache_path = decode_cache_path(original_file)
+        except OSError:
+            pass
+
+    # 命中解码缓存时直接内存映射像素，原图只需硬链接/复制，无需读取和解码
+    img = load_decode_cache(cache_path) if cache_path is not None else None
+    if img is not None:
+        placed = place_original(original_file, original_target)
+    else:
+        # 原图只读取一次：同一份内容既用于放置原图，也用于解码增强
+        try:
+            with open(original_file, 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = b''
+        placed = place_original(original_file, original_target, data)
 
-    times, rem = divmod(target_count - len(original_files), len(original_files))
-    augmented_files = []
-    augmentation_count = 0
+        if PYVIPS_AVAILABLE:
+            return placed, _augment_one_vips(original_file, data, aug_targets)
 
-    for i, original_file in enumerate(original_files):
-        img = cv2.imread(str(original_file))
+        img = decode_image(data, original_file.suffix)
         if img is None:
             print(f"  警告: 无法读取图片 {original_file}，跳过")
+            return placed, 0
+        if cache_path is not None:
+            save_decode_cache(cache_path, img)
+
+    np.random.seed(seed)
+    if hasattr(AUG, 'set_random_seed'):  # albumentations 2.x 使用自己的随机数生成器
+        AUG.set_random_seed(seed)
+
+    for aug_filepath in aug_targets:
+        augmented = AUG(image=img)['image']
+        if random.random() < BRIGHTNESS_CONTRAST_P:
+            # uint8只有256种取值，预先计算查找表，cv2.LUT逐像素查表代替浮点运算
+            alpha, beta = random_brightness_contrast()
+            lut = np.clip(np.arange(256) * alpha + beta, 0, 255).astype(np.uint8)
+            augmented = cv2.LUT(augmented, lut)
+        write_image(aug_filepath, augmented)
+
+    return placed, len(aug_targets)
+
+
+def _augment_one_vips(original_file, data, aug_targets):
+    """
+    使用pyvips生成增强图片，概率与 AUG 及 BRIGHTNESS_CONTRAST_P 保持一致：
+    水平翻转50%，随机旋转90度倍数50%，亮度对比度调整30%
+    """
+    try:
+        # 原图只解码一次，保存在内存中供多张增强图片复用
+        source = pyvips.Image.new_from_buffer(data, "").copy_memory()
+    except pyvips.Error:
+        print(f"  警告: 无法读取图片 {original_file}，跳过")
+        return 0
+
+    save_options = {'Q': JPEG_QUALITY} if original_file.suffix.lower() in JPEG_SUFFIXES else {}
+
+    for aug_filepath in aug_targets:
+        img = source
+        if random.random() < 0.5:
+            img = img.fliphor()
+        if random.random() < 0.5:
+            # 与 np.rot90 相同，逆时针旋转 turns×90 度（turns=0 时不旋转）
+            turns = random.randint(0, 3)
+            if turns == 1:
+                img = img.rot270()
+            elif turns == 2:
+                img = img.rot180()
+            elif turns == 3:
+                img = img.rot90()
+        if random.random() < BRIGHTNESS_CONTRAST_P:
+            alpha, beta = random_brightness_contrast()
+            img = img.linear(alpha, beta).cast(source.format)
+
+        img.write_to_file(str(aug_filepath), **save_options)
+
+    return len(aug_targets)
+
+
+def plan_samples(original_files, target_count, train_dir, val_dir):
+    """
+    先按样本序号划分训练集和验证集，再为每个样本确定最终文件路径
+    样本序号前 len(original_files) 个为原图，其余依次为各原图的增强图片
+
+    返回:
+        place_jobs: [(原图路径, 目标路径), ...]，无需增强的原图
+        aug_tasks: [(原图路径, 原图目标路径, [增强图片目标路径, ...]), ...]
+    """
+    # 划分训练集和验证集 (1200:300)
+    train_idx, val_idx = train_test_split(
+        range(target_count),
+        train_size=TRAIN_COUNT,
+        test_size=VAL_COUNT,
+        random_state=42
+    )
+    targets = [None] * target_count
+    for i, idx in enumerate(train_idx):
+        targets[idx] = (train_dir, f"train_{i:05d}")
+    for i, idx in enumerate(val_idx):
+        targets[idx] = (val_dir, f"val_{i:05d}")
+
+    # 每张原图需要生成的增强图片数量，使总数达到 target_count
+    aug_counts = [0] * len(original_files)
+    if len(original_files) < target_count:
+        print(f"  需要增强: {len(original_files)} -> {target_count} 张")
+        times, rem = divmod(target_count - len(original_files), len(original_files))
+        aug_counts = [times + (1 if i < rem else 0) for i in range(len(original_files))]
+
+    # 需要增强的原图由增强进程一并放置（只读取一次），其余原图交给线程池放置
+    place_jobs = []
+    aug_tasks = []
+    idx = len(original_files)
+    for i, (original_file, aug_needed) in enumerate(zip(original_files, aug_counts)):
+        target_dir, name = targets[i]
+        original_target = target_dir / f"{name}{original_file.suffix}"
+        if aug_needed == 0:
+            place_jobs.append((original_file, original_target))
             continue
+        aug_targets = [target_dir / f"{name}{original_file.suffix}"
+                       for target_dir, name in targets[idx:idx + aug_needed]]
+        aug_tasks.append((original_file, original_target, aug_targets))
+        idx += aug_needed
 
-        aug_needed = times + (1 if i < rem else 0)
+    return place_jobs, aug_tasks
 
-        for k in range(aug_needed):
-            augmented = AUG(image=img)
-            aug_filename = f"{original_file.stem}_aug{augmentation_count}{original_file.suffix}"
-            aug_filepath = dst / 'temp_aug' / class_name / aug_filename
 
-            aug_filepath.parent.mkdir(parents=True, exist_ok=True)
-            cv2.imwrite(str(aug_filepath), augmented['image'])
-            augmented_files.append(aug_filepath)
-            augmentation_count += 1
+def augment_images(aug_tasks, executor):
+    """
+    对原始图片进行数据增强（每张原图的增强在进程池中并行执行）
+    返回 (放置成功的原图数量, 成功生成的增强图片数量)
+    """
+    results = list(executor.map(_augment_one, aug_tasks, chunksize=16))
+    return sum(placed for placed, _ in results), sum(count for _, count in results)
 
-    return original_files + augmented_files
+
+def is_valid_image(path):
+    """
+    校验图片文件：只读取文件头确认宽高非零，不解码像素
+    未安装 imagesize 时退化为检查文件是否存在
+    """
+    if not IMAGESIZE_AVAILABLE:
+        return path.exists()
+    try:
+        width, height = imagesize.get(str(path))
+    except (OSError, ValueError):
+        return False
+    return width > 0 and height > 0
 
 
-def copy_files_with_retry(file_list, target_dir, file_type):
+def place_original(file_path, target_path, data=None):
     """
-    复制文件并重试机制，确保文件确实被复制
+    放置单张原图并确认目标有效：开启 USE_HARDLINKS 时优先用硬链接（不复制数据），
+    否则或跨卷、文件系统不支持时复制；已读入内存的内容直接写出，不再重新读取原图
     """
-    success_count = 0
-    for i, file_path in enumerate(file_list):
-        try:
-            # 生成目标文件名
-            if hasattr(file_path, 'suffix'):
-                # 如果是路径对象
-                new_filename = f"{file_type}_{i:05d}{file_path.suffix}"
+    try:
+        linked = False
+        if USE_HARDLINKS:
+            try:
+                os.link(file_path, target_path)
+                linked = True
+            except OSError:
+                pass
+
+        if not linked:
+            if data:
+                with open(target_path, 'wb') as f:
+                    f.write(data)
             else:
-                # 如果是字符串路径
-                file_path = pathlib.Path(file_path)
-                new_filename = f"{file_type}_{i:05d}{file_path.suffix}"
+                shutil.copy2(file_path, target_path)
 
-            target_path = target_dir / new_filename
+        # 验证文件确实存在且文件头完整
+        if is_valid_image(target_path):
+            return True
+        print(f"  警告: 文件放置后不存在或已损坏 {target_path}")
 
-            # 复制文件
-            shutil.copy2(file_path, target_path)
+    except Exception as e:
+        print(f"  放置文件失败 {file_path}: {e}")
 
-            # 验证文件是否确实存在
-            if target_path.exists():
-                success_count += 1
-            else:
-                print(f"  警告: 文件复制后不存在 {target_path}")
+    return False
 
-        except Exception as e:
-            print(f"  复制文件失败 {file_path}: {e}")
 
-    return success_count
+def place_originals(place_jobs):
+    """
+    将原图放置到最终的 train/val 位置（多线程并行），返回成功数量
+    """
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+        return sum(executor.map(lambda job: place_original(*job), place_jobs))
 
 
 def main():
@@ -103,11 +393,6 @@ def main():
     dst.mkdir(parents=True, exist_ok=True)
     print(f"目标目录: {dst}")
 
-    # 清理之前的临时目录和目标目录
-    temp_dir = dst / 'temp_aug'
-    if temp_dir.exists():
-        shutil.rmtree(temp_dir)
-
     # 清理之前的输出目录
     for subdir in ['train', 'val']:
         output_dir = dst / subdir
@@ -115,72 +400,65 @@ def main():
             shutil.rmtree(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
 
-    # 遍历原数据集中的每个类别文件夹
-    for cls_dir in src.iterdir():
-        if not cls_dir.is_dir():
-            continue
+    # 数据增强进程池，所有类别共用（Windows下以spawn启动，依赖 __main__ 保护）
+    with ProcessPoolExecutor(max_workers=AUG_WORKERS, initializer=_init_aug_worker) as aug_executor:
+        # 遍历原数据集中的每个类别文件夹
+        for cls_dir in src.iterdir():
+            if not cls_dir.is_dir():
+                continue
 
-        print(f"\n正在处理类别: {cls_dir.name}")
+            print(f"\n正在处理类别: {cls_dir.name}")
 
-        # 获取所有图片文件
-        files = []
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']
-        for ext in image_extensions:
-            files.extend(cls_dir.glob(f'*{ext}'))
-            files.extend(cls_dir.glob(f'*{ext.upper()}'))
+            # 获取所有图片文件
+            files = []
+            image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']
+            for ext in image_extensions:
+                files.extend(cls_dir.glob(f'*{ext}'))
+                files.extend(cls_dir.glob(f'*{ext.upper()}'))
 
-        print(f"  在原文件夹中找到 {len(files)} 张图片")
+            print(f"  在原文件夹中找到 {len(files)} 张图片")
 
-        if not files:
-            print(f"  警告: {cls_dir.name} 中没有找到图片文件，跳过该类别")
-            continue
+            if not files:
+                print(f"  警告: {cls_dir.name} 中没有找到图片文件，跳过该类别")
+                continue
 
-        # 如果原图数量超过目标数量，随机选择TOTAL_COUNT张
-        if len(files) > TOTAL_COUNT:
-            files = random.sample(files, TOTAL_COUNT)
-            print(f"  随机选择 {TOTAL_COUNT} 张原图")
+            # 如果原图数量超过目标数量，随机选择TOTAL_COUNT张
+            if len(files) > TOTAL_COUNT:
+                files = random.sample(files, TOTAL_COUNT)
+                print(f"  随机选择 {TOTAL_COUNT} 张原图")
 
-        # 数据增强：确保总图片数量达到TOTAL_COUNT
-        all_files = augment_images(files, TOTAL_COUNT, cls_dir.name)
-        print(f"  增强后共有 {len(all_files)} 张图片")
+            # 按文件名排序，按目录顺序读取原图，提高顺序读取的局部性
+            files.sort()
 
-        # 划分训练集和验证集 (1200:300)
-        train_files, val_files = train_test_split(
-            all_files,
-            train_size=TRAIN_COUNT,
-            test_size=VAL_COUNT,
-            random_state=42
-        )
+            # 创建目标目录
+            train_dir = dst / 'train' / cls_dir.name
+            val_dir = dst / 'val' / cls_dir.name
+            train_dir.mkdir(parents=True, exist_ok=True)
+            val_dir.mkdir(parents=True, exist_ok=True)
 
-        # 创建目标目录
-        train_dir = dst / 'train' / cls_dir.name
-        val_dir = dst / 'val' / cls_dir.name
-        train_dir.mkdir(parents=True, exist_ok=True)
-        val_dir.mkdir(parents=True, exist_ok=True)
+            # 先划分再增强：原图和增强图片都直接写到最终位置，不再经过临时目录
+            place_jobs, aug_tasks = plan_samples(files, TOTAL_COUNT, train_dir, val_dir)
 
-        print(f"  开始复制文件...")
+            print(f"  开始放置原图并生成增强图片...")
 
-        # 复制训练集图片
-        train_count = copy_files_with_retry(train_files, train_dir, 'train')
+            # 无需增强的原图硬链接/复制到最终位置
+            original_count = place_originals(place_jobs)
 
-        # 复制验证集图片
-        val_count = copy_files_with_retry(val_files, val_dir, 'val')
+            # 数据增强：确保总图片数量达到TOTAL_COUNT（需要增强的原图在增强进程中一并放置）
+            placed_count, aug_count = augment_images(aug_tasks, aug_executor)
+            original_count += placed_count
 
-        print(f"  复制完成: 训练集 {train_count} 张, 验证集 {val_count} 张")
+            print(f"  完成: 原图 {original_count} 张, 增强 {aug_count} 张")
 
-        # 立即验证当前类别的文件数量
-        actual_train = len(list(train_dir.iterdir()))
-        actual_val = len(list(val_dir.iterdir()))
+            # 立即验证当前类别的文件数量
+            actual_train = len(list(train_dir.iterdir()))
+            actual_val = len(list(val_dir.iterdir()))
 
-        if actual_train == TRAIN_COUNT and actual_val == VAL_COUNT:
-            print(f"  ✅ {cls_dir.name} 类别文件数量正确")
-        else:
-            print(
-                f"  ⚠️  {cls_dir.name} 类别文件数量不正确: 训练集{actual_train}/{TRAIN_COUNT}, 验证集{actual_val}/{VAL_COUNT}")
-
-    # 清理临时目录
-    if temp_dir.exists():
-        shutil.rmtree(temp_dir)
+            if actual_train == TRAIN_COUNT and actual_val == VAL_COUNT:
+                print(f"  ✅ {cls_dir.name} 类别文件数量正确")
+            else:
+                print(
+                    f"  ⚠️  {cls_dir.name} 类别文件数量不正确: 训练集{actual_train}/{TRAIN_COUNT}, 验证集{actual_val}/{VAL_COUNT}")
 
 
 def print_final_statistics():
@@ -454,9 +454,9 @@ class SimpleCellClassifier:
 
         # ====== 获取所有类别概率 ======
         class_probs = []
-        for i, prob in enumerate(result.probs.data):
+        # 概率一次性拷贝到CPU，避免逐个 .item() 各触发一次GPU同步
+        for i, confidence in enumerate(result.probs.data.cpu().tolist()):
             class_name = result.names[i]
-            confidence = prob.item()
             class_probs.append((class_name, confidence))
 
         # ====== 按置信度排序 ======
@@ -733,9 +733,9 @@ class SimpleCellClassifier:
 
                 # 获取所有类别概率（只显示大于1%的）
                 class_probs = []
-                for i, prob in enumerate(result.probs.data):
+                # 概率一次性拷贝到CPU，避免逐个 .item() 各触发一次GPU同步
+                for i, confidence in enumerate(result.probs.data.cpu().tolist()):
                     class_name_item = result.names[i]
-                    confidence = prob.item()
                     if confidence > 0.01:  # 只显示概率大于1%的类别
                         class_probs.append((class_name_item, confidence))
 
@@ -950,9 +950,9 @@ class SimpleCellClassifier:
 
                 # 获取所有类别概率（只显示大于1%的）
                 class_probs = []
-                for i, prob in enumerate(result.probs.data):
+                # 概率一次性拷贝到CPU，避免逐个 .item() 各触发一次GPU同步
+                for i, confidence in enumerate(result.probs.data.cpu().tolist()):
                     class_name_item = result.names[i]
-                    confidence = prob.item()
                     if confidence > 0.01:  # 只显示概率大于1%的类别
                         class_probs.append((class_name_item, confidence))
 
@@ -23,8 +23,10 @@ def create_video_from_folders(folder_paths, output_video="bloodcells_video.mp4",
 
         folder_name = os.path.basename(folder_path)
         # 获取文件夹中所有图片文件
-        image_files = [f for f in os.listdir(folder_path)
-                       if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))]
+        # os.scandir 直接给出完整路径，无需再逐个 os.path.join
+        with os.scandir(folder_path) as entries:
+            image_files = [e.path for e in entries
+                           if e.name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))]
 
         if len(image_files) < img_per_folder:
             print(f"警告: {folder_name} 中图片数量不足 {img_per_folder} 张，只有 {len(image_files)} 张")
@@ -34,7 +36,7 @@ def create_video_from_folders(folder_paths, output_video="bloodcells_video.mp4",
 
         for img_file in selected_images:
             all_images.append({
-                'path': os.path.join(folder_path, img_file),
+                'path': img_file,
                 'folder_name': folder_name
             })
 
@@ -22,15 +22,17 @@ def create_video_from_folders(folder_paths,
             continue
 
         folder_name = os.path.basename(folder_path)
-        image_files = [f for f in os.listdir(folder_path)
-                       if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))]
+        # os.scandir 直接给出完整路径，无需再逐个 os.path.join
+        with os.scandir(folder_path) as entries:
+            image_files = [e.path for e in entries
+                           if e.name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))]
 
         if len(image_files) < img_per_folder:
             print(f"警告: {folder_name} 中图片数量不足 {img_per_folder} 张，只有 {len(image_files)} 张")
 
         selected_images = random.sample(image_files,
                                         min(img_per_folder, len(image_files)))
-        all_images.extend([(os.path.join(folder_path, f), folder_name) for f in selected_images])
+        all_images.extend([(f, folder_name) for f in selected_images])
         print(f"从 {folder_name} 选择了 {len(selected_images)} 张图片")
 
     if not all_images: